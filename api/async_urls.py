@@ -0,0 +1,28 @@
+from django.urls import path
+from rest_framework_simplejwt.views import (TokenObtainPairView,
+                                            TokenRefreshView)
+
+from .async_views import (AsyncOrganisationDetailView,
+                          AsyncOrganisationMembersView, AsyncOrganisationView,
+                          AsyncUserView)
+from .views import (ExportView, OrganisationBatchView, OrganisationSearchView,
+                    UserBatchView, UserDirectoryView)
+
+urlpatterns = [
+    path('token/',  TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+
+    path('organisations', AsyncOrganisationView.as_view(), name='organisations'),
+    path('organisations/batch', OrganisationBatchView.as_view(), name='organisations_batch'),
+    path('organisations/search', OrganisationSearchView.as_view(), name='organisations_search'),
+    path('organisations/<uuid:orgId>', AsyncOrganisationDetailView.as_view(), name='org_details'),
+    path('organisations/<uuid:orgId>/users', AsyncOrganisationMembersView.as_view(), name='add_user'),
+
+    path('export/organisations', ExportView.as_view(), {'name': 'organisations'}, name='export_organisations'),
+    path('export/members', ExportView.as_view(), {'name': 'members'}, name='export_members'),
+
+    path('users', UserBatchView.as_view(), name='users_list'),
+    path('users/batch', UserBatchView.as_view(), name='users_batch'),
+    path('users/search', UserDirectoryView.as_view(), name='users_search'),
+    path('users/<uuid:userId>', AsyncUserView.as_view(), name='users'),
+]
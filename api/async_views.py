@@ -0,0 +1,320 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import alogin, user_logged_in
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import serializers, status
+from rest_framework.exceptions import (AuthenticationFailed, NotFound,
+                                       ParseError, UnsupportedMediaType)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import hashing
+from .authentication import CachedJWTAuthentication
+from .backends import PooledModelBackend
+from .cache import bump_organisation_lists
+from .conditional import content_etag, not_modified
+from .fast_serializers import compile_serializer
+from .hashing import HashingUnavailable
+from .models import Organisation, User
+from .pagination import OrganisationMemberPagination
+from .serializers import (LoginSerializer, OrganisationMemberSerializer,
+                          OrganisationSerializer, RegisterUserSerializer,
+                          UserSerializer)
+from .views import OrganisationBatchView, organisation_list_page, split_ids
+
+# Async counterparts of the views in api/views.py, served by hngUser/asgi.py
+# through hngUser/asgi_urls.py. DRF's APIView is sync-only, so these sit on
+# Django's View and keep the same request and response shapes.
+
+
+def json_response(data, status):
+    return HttpResponse(JSONRenderer().render(data), status=status,
+                        content_type='application/json')
+
+
+def client_error_response():
+    return json_response({
+        "status": "Bad request",
+        "message": "Client error",
+        "statusCode": 400
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def permission_denied_response():
+    return json_response({"detail": "You do not have permission to perform this action."},
+                         status=status.HTTP_403_FORBIDDEN)
+
+
+def not_modified_response(etag):
+    response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    response["ETag"] = etag
+    return response
+
+
+def hashing_unavailable_response():
+    return json_response({
+        "status": "Service unavailable",
+        "message": "Server busy, try again shortly",
+        "statusCode": 503
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+def registration_failed_response(errors):
+    return json_response({
+        "status": "Bad request",
+        "message": "Registration unsuccessful",
+        "errors": errors,
+        "statusCode": 400
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncAPIView(View):
+    """
+    JSON out, optional JWT authentication. The body is parsed by the same
+    DEFAULT_PARSER_CLASSES as DRF's views (JSON, form and multipart unless
+    the settings narrow them), and handlers get it as `request.data`.
+    """
+    authentication_required = False
+    authenticator = CachedJWTAuthentication()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated API, same as DRF's APIView.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        # The ASGI handler has received the whole body by now, so parsing it
+        # never waits on the client. A chunked body comes without a length,
+        # which DRF would read as no body at all.
+        if 'CONTENT_LENGTH' not in request.META:
+            request.META['CONTENT_LENGTH'] = str(len(request.body))
+        parsers = [parser() for parser in api_settings.DEFAULT_PARSER_CLASSES]
+        try:
+            request.data = Request(request, parsers=parsers).data
+        except (ParseError, UnsupportedMediaType) as exc:
+            return json_response({"detail": exc.detail}, status=exc.status_code)
+
+        if self.authentication_required:
+            try:
+                result = await self.authenticator.aauthenticate(request)
+            except (InvalidToken, AuthenticationFailed) as exc:
+                detail = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+                return json_response(detail, status=status.HTTP_401_UNAUTHORIZED)
+            if result is None:
+                return json_response(
+                    {"detail": "Authentication credentials were not provided."},
+                    status=status.HTTP_401_UNAUTHORIZED)
+            request.user, request.auth = result
+
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncUserView(AsyncAPIView):
+    authentication_required = True
+
+    async def get(self, request, userId):
+        values = await User.objects.filter(userId=userId).values(
+            *UserSerializer.Meta.fields).afirst()
+        if values is None:
+            return client_error_response()
+
+        etag = content_etag(values)
+        if not_modified(request, etag):
+            return not_modified_response(etag)
+
+        response = json_response({
+            "status": "success",
+            "message": "User Data Retrieved",
+            "data": compile_serializer(UserSerializer).serialize(values)
+        }, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        return response
+
+
+class AsyncOrganisationView(AsyncAPIView):
+    authentication_required = True
+
+    async def get(self, request):
+        if 'ids' in request.GET:
+            return json_response(*await sync_to_async(self.lookup)(request))
+
+        try:
+            page_data = await sync_to_async(organisation_list_page)(Request(request), request.user)
+        except (NotFound, serializers.ValidationError):
+            # A bad cursor.
+            return client_error_response()
+
+        return json_response({
+            "status": "success",
+            "message": f"{request.user.firstName}'s Organisations",
+            "data": page_data
+        }, status=status.HTTP_200_OK)
+
+    def lookup(self, request):
+        response = OrganisationBatchView.lookup(request, split_ids(request.GET['ids']))
+        return response.data, response.status_code
+
+    async def post(self, request):
+        serializer = OrganisationSerializer(data=request.data)
+        if not await sync_to_async(serializer.is_valid)():
+            return json_response({
+                "status": "Bad Request",
+                "message": "Client error",
+                "statusCode": 400
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        org = await Organisation.objects.acreate_organisation(
+            owner=request.user, **serializer.validated_data)
+        return json_response(OrganisationSerializer(org).data, status=status.HTTP_201_CREATED)
+
+
+class AsyncOrganisationDetailView(AsyncAPIView):
+    authentication_required = True
+
+    async def get(self, request, orgId):
+        values = await Organisation.objects.filter(orgId=orgId).values(
+            *OrganisationSerializer.Meta.fields).afirst()
+        if values is None:
+            return client_error_response()
+
+        etag = content_etag(values)
+        if not_modified(request, etag):
+            return not_modified_response(etag)
+
+        response = json_response({
+            "status": "success",
+            "message": "Organisation Data Retrieved",
+            "data": compile_serializer(OrganisationSerializer).serialize(values)
+        }, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        return response
+
+    async def post(self, request, orgId):
+        user_ids = request.data.get('userIds', request.data.get('userId'))
+        try:
+            org = await Organisation.objects.aget(orgId=orgId)
+            # Same rule as the isOwner permission on OrganisationDetailView.
+            if org.owner_id != request.user.pk:
+                return permission_denied_response()
+            if isinstance(user_ids, list):
+                return await self.add_users(org, user_ids)
+            user = await User.objects.aget(userId=user_ids)
+        except (ObjectDoesNotExist, ValidationError):
+            return client_error_response()
+
+        await org.users.aadd(user)
+        await sync_to_async(bump_organisation_lists)(user.pk)
+        return json_response({
+            "status": "success",
+            "message": "User added to organisation successfully",
+        }, status=status.HTTP_200_OK)
+
+    async def add_users(self, org, user_ids):
+        if not 0 < len(user_ids) <= settings.BULK_ADD_MAX_USERS:
+            return client_error_response()
+
+        return json_response({
+            "status": "success",
+            "message": "Users added to organisation successfully",
+            "data": {
+                "results": await sync_to_async(org.add_members)(user_ids)
+            }
+        }, status=status.HTTP_200_OK)
+
+
+class AsyncOrganisationMembersView(AsyncOrganisationDetailView):
+
+    async def get(self, request, orgId):
+        org = await Organisation.objects.filter(
+            orgId=orgId, memberships__user=request.user).only('pk').afirst()
+        paginator = OrganisationMemberPagination()
+        try:
+            if org is None:
+                raise NotFound
+            page = await sync_to_async(paginator.paginate_queryset)(org.member_rows(), Request(request))
+        except NotFound:
+            return client_error_response()
+
+        return json_response({
+            "status": "success",
+            "message": "Organisation Members Retrieved",
+            "data": {
+                "users": OrganisationMemberSerializer(page, many=True).data,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link()
+            }
+        }, status=status.HTTP_200_OK)
+
+
+class AsyncRegisterUserView(AsyncAPIView):
+
+    async def post(self, request):
+        serializer = RegisterUserSerializer(data=request.data)
+        if not await sync_to_async(serializer.is_valid)():
+            return registration_failed_response(serializer.errors)
+
+        validated_data = dict(serializer.validated_data)
+        try:
+            validated_data['password'] = await hashing.amake_password(validated_data.get('password'))
+        except HashingUnavailable:
+            return hashing_unavailable_response()
+
+        # Transactions are sync-only, so the inserts run in one thread.
+        try:
+            user = await sync_to_async(serializer.register)(validated_data)
+        except serializers.ValidationError as exc:
+            return registration_failed_response(exc.detail)
+        refresh = RefreshToken.for_user(user)
+
+        return json_response({
+            "status": "success",
+            "message": "Registration successful",
+            "data": {
+                "accessToken": str(refresh.access_token),
+                "user": UserSerializer(user).data
+            }
+        }, status=status.HTTP_201_CREATED)
+
+
+class AsyncLoginView(AsyncAPIView):
+    backend = PooledModelBackend()
+
+    async def post(self, request):
+        serializer = LoginSerializer(data=request.data)
+
+        if serializer.is_valid():
+            credentials = serializer.data
+            try:
+                user = await self.backend.aauthenticate(
+                    request, email=credentials['email'], password=credentials['password'])
+            except HashingUnavailable:
+                return hashing_unavailable_response()
+            if user:
+                if hasattr(request, 'session'):
+                    await alogin(request, user, backend='api.backends.PooledModelBackend')
+                else:
+                    await user_logged_in.asend(sender=user.__class__, request=request, user=user)
+                refresh = RefreshToken.for_user(user)
+
+                return json_response({
+                    "status": "success",
+                    "message": "Login successful",
+                    "data": {
+                        "accessToken": str(refresh.access_token),
+                        "user": UserSerializer(user).data
+                    }
+                }, status=status.HTTP_200_OK)
+
+        return json_response({
+            "status": "Bad request",
+            "message": "Authentication failed",
+            "errors": serializer.errors,
+            "statusCode": 401
+        }, status=status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,65 @@
+import copy
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import LRUCache
+
+user_cache = LRUCache(
+    max_size=settings.JWT_USER_CACHE['MAX_SIZE'],
+    ttl=settings.JWT_USER_CACHE['TTL'],
+)
+
+
+def user_cache_key(value):
+    return str(value)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from an in-process cache
+    instead of querying the users table on every request.
+
+    Entries are keyed by the token's user claim and dropped whenever the user
+    is saved or deleted, including the entry under the old claim value when
+    a save changes it (see api/signals.py).
+    """
+
+    def get_cached_user(self, validated_token):
+        if not settings.JWT_USER_CACHE['ENABLED'] or api_settings.CHECK_REVOKE_TOKEN:
+            # The revocation claim is per token, so it can't be served from cache.
+            return None
+        user = user_cache.get(user_cache_key(validated_token.get(api_settings.USER_ID_CLAIM)))
+        # Hand out a copy so per-request state never leaks between requests.
+        return copy.copy(user) if user is not None else None
+
+    def load_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if settings.JWT_USER_CACHE['ENABLED']:
+            user_cache.set(user_cache_key(validated_token.get(api_settings.USER_ID_CLAIM)), user)
+            user = copy.copy(user)
+        return user
+
+    def get_user(self, validated_token):
+        return self.get_cached_user(validated_token) or self.load_user(validated_token)
+
+    async def aauthenticate(self, request):
+        """
+        Coroutine counterpart of authenticate() for the async views. Only a
+        cache miss leaves the event loop.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        user = self.get_cached_user(validated_token)
+        if user is None:
+            user = await sync_to_async(self.load_user)(validated_token)
+        return user, validated_token
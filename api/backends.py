@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from . import hashing
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend that verifies passwords through the hashing pool instead of
+    on the request thread.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Keep the timing of unknown emails in line with known ones.
+            hashing.make_password(password)
+        else:
+            is_correct, must_update = hashing.verify_password(password, user.password)
+            if is_correct and must_update:
+                user.password = hashing.make_password(password)
+                user.save(update_fields=['password'])
+            if is_correct and self.user_can_authenticate(user):
+                return user
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = await UserModel._default_manager.aget(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            await hashing.amake_password(password)
+        else:
+            is_correct, must_update = await hashing.averify_password(password, user.password)
+            if is_correct and must_update:
+                user.password = await hashing.amake_password(password)
+                await user.asave(update_fields=['password'])
+            if is_correct and self.user_can_authenticate(user):
+                return user
@@ -0,0 +1,183 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with an optional time-to-live.
+    Keeps hit/miss counters so callers can report a hit rate.
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class DjangoCacheBackend:
+    """
+    Adapts one of the configured Django CACHES to the get/set interface of
+    LRUCache.
+    """
+
+    def __init__(self, alias, ttl=None):
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        return self.cache.get(key, default)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.ttl)
+
+    def set_many(self, mapping):
+        self.cache.set_many(mapping, self.ttl)
+
+
+class OrganisationListCache:
+    """
+    Caches each user's "my organisations" pages behind a per-user generation
+    stamp. Entries are keyed by the stamp, so bumping it makes every page
+    cached for that user unreachable without deleting anything; the backend
+    ages them out on its own.
+
+    A missing stamp is replaced by a fresh one rather than restarting from
+    zero, so an evicted generation can never resurrect old entries.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _generation_key(user_id):
+        return f"orgs:gen:{user_id}"
+
+    @staticmethod
+    def _new_generation():
+        return time.time_ns()
+
+    def generation(self, user_id):
+        key = self._generation_key(user_id)
+        generation = self.backend.get(key)
+        if generation is None:
+            generation = self._new_generation()
+            self.backend.set(key, generation)
+        return generation
+
+    def _entry_key(self, user_id, generation, variant):
+        digest = hashlib.sha1(variant.encode()).hexdigest()
+        return f"orgs:{user_id}:{generation}:{digest}"
+
+    def lookup(self, user_id, variant):
+        """
+        Returns (generation, value); value is None on a miss. Pass the
+        generation back to store() so a bump that lands in between wins.
+        """
+        generation = self.generation(user_id)
+        value = self.backend.get(self._entry_key(user_id, generation, variant))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return generation, value
+
+    def store(self, user_id, generation, variant, value):
+        self.backend.set(self._entry_key(user_id, generation, variant), value)
+
+    def bump(self, *user_ids):
+        stamps = {self._generation_key(user_id): self._new_generation() for user_id in user_ids}
+        if hasattr(self.backend, 'set_many'):
+            self.backend.set_many(stamps)
+        else:
+            for key, generation in stamps.items():
+                self.backend.set(key, generation)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_organisation_list_cache = None
+
+
+def get_organisation_list_cache():
+    global _organisation_list_cache
+    if _organisation_list_cache is None:
+        config = settings.ORG_LIST_CACHE
+        if config['BACKEND'] == 'lru':
+            backend = LRUCache(max_size=config['MAX_SIZE'], ttl=config['TTL'])
+        else:
+            backend = DjangoCacheBackend(config['BACKEND'], ttl=config['TTL'])
+        _organisation_list_cache = OrganisationListCache(backend)
+    return _organisation_list_cache
+
+
+def bump_organisation_lists(*user_ids):
+    """
+    Invalidate the cached organisation lists of `user_ids`. Inside a
+    transaction the stamps are bumped again on commit, so a reader can't
+    cache pre-commit rows under the new generation.
+    """
+    if not user_ids or not settings.ORG_LIST_CACHE['ENABLED']:
+        return
+    cache = get_organisation_list_cache()
+    cache.bump(*user_ids)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: cache.bump(*user_ids))
@@ -0,0 +1,28 @@
+import hashlib
+import json
+
+from django.utils.http import parse_etags, quote_etag
+
+
+def content_etag(values):
+    """
+    Strong ETag derived from the values a response is built from.
+    """
+    payload = json.dumps(values, default=str, sort_keys=True, separators=(',', ':'))
+    return quote_etag(hashlib.sha1(payload.encode()).hexdigest())
+
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def not_modified(request, etag):
+    """
+    True when the request's If-None-Match already names `etag`. Uses the weak
+    comparison RFC 9110 prescribes for If-None-Match.
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return etags == ['*'] or _opaque(etag) in {_opaque(tag) for tag in etags}
@@ -0,0 +1,78 @@
+import csv
+import json
+from uuid import UUID
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .models import Membership, Organisation
+
+# Each export is a list of (column name, ORM lookup) pairs; rows are read
+# with values_list(...).iterator() so only one chunk is in memory at a time.
+EXPORTS = {
+    'organisations': (
+        Organisation.objects.order_by('id'),
+        [('orgId', 'orgId'), ('name', 'name'), ('description', 'description'),
+         ('ownerId', 'owner_id')],
+    ),
+    'members': (
+        Membership.objects.order_by('organisation_id'),
+        [('orgId', 'organisation__orgId'), ('userId', 'user__userId'),
+         ('email', 'user__email'), ('firstName', 'user__firstName'),
+         ('lastName', 'user__lastName'), ('role', 'role')],
+    ),
+}
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    # csv.writer target that hands back each formatted line.
+    def write(self, value):
+        return value
+
+
+def cell(value):
+    return str(value) if isinstance(value, UUID) else value
+
+
+def ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, map(cell, row)))) + '\n'
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([cell(value) for value in row])
+
+
+def batched(lines, size):
+    # One write per `size` rows instead of one per row.
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def export_response(name, output):
+    """
+    Stream export `name` as `output` ('ndjson' or 'csv').
+    """
+    queryset, fields = EXPORTS[name]
+    columns = [column for column, _ in fields]
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    rows = queryset.values_list(*(lookup for _, lookup in fields)).iterator(chunk_size=chunk_size)
+    lines = ndjson_lines(columns, rows) if output == 'ndjson' else csv_lines(columns, rows)
+
+    response = StreamingHttpResponse(batched(lines, chunk_size), content_type=CONTENT_TYPES[output])
+    response['Content-Disposition'] = f'attachment; filename="{name}.{output}"'
+    return response
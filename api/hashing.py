@@ -0,0 +1,139 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class HashingUnavailable(Exception):
+    """
+    Raised when the hashing pool is saturated or a hash does not finish in time.
+    """
+
+
+def _init_worker(settings_module):
+    # Workers are spawned, not forked, so they only need enough of Django to
+    # read PASSWORD_HASHERS.
+    if settings_module:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+
+class PasswordHashingPool:
+    """
+    Runs PBKDF2 (or whatever PASSWORD_HASHERS selects) in a bounded pool of
+    worker processes so a burst of logins doesn't stall the request worker.
+
+    At most `max_pending` hashes may be queued or running at once; anything
+    beyond that is rejected straight away instead of piling up behind the
+    workers. With `workers=0` hashing runs inline.
+    """
+
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE'),),
+                )
+            return self._executor
+
+    def _reset_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingUnavailable('Password hashing queue is full')
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset_executor(executor)
+            raise HashingUnavailable('Password hashing pool is unavailable')
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise HashingUnavailable('Password hashing timed out')
+        except BrokenProcessPool:
+            raise HashingUnavailable('Password hashing pool is unavailable')
+
+    async def arun(self, fn, *args):
+        if not self.workers:
+            return await sync_to_async(fn, thread_sensitive=False)(*args)
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise HashingUnavailable('Password hashing timed out')
+        except BrokenProcessPool:
+            raise HashingUnavailable('Password hashing pool is unavailable')
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            config = settings.PASSWORD_HASHING_POOL
+            _pool = PasswordHashingPool(
+                workers=config['WORKERS'],
+                max_pending=config['MAX_PENDING'],
+                timeout=config['TIMEOUT'],
+            )
+        return _pool
+
+
+def make_password(password):
+    return get_pool().run(hashers.make_password, password)
+
+
+def verify_password(password, encoded):
+    # Returns (is_correct, must_update), see django.contrib.auth.hashers.
+    return get_pool().run(hashers.verify_password, password, encoded)
+
+
+async def amake_password(password):
+    return await get_pool().arun(hashers.make_password, password)
+
+
+async def averify_password(password, encoded):
+    return await get_pool().arun(hashers.verify_password, password, encoded)
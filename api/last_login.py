@@ -0,0 +1,145 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import update_last_login
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import User
+
+logger = logging.getLogger('hngUser.last_login')
+
+
+class LastLoginBuffer:
+    """
+    Write-behind buffer for User.last_login. Logins only record a timestamp
+    in memory; pending timestamps are written in one batched UPDATE once the
+    oldest has waited `max_lag` seconds or `max_pending` users are queued,
+    so a login storm costs one statement per flush instead of one per login.
+
+    Flushing happens inline in the record() that finds the buffer due, at
+    the end of a request (see flush_if_due()) and at interpreter exit, never
+    on a background thread, so it works the same on instances that are
+    frozen between requests.
+    """
+
+    def __init__(self, max_lag, max_pending, batch_size=1000):
+        self.max_lag = max_lag
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._oldest = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, user_id, when):
+        """
+        Queue a timestamp, writing the whole buffer right away if that makes
+        it due, so MAX_LAG holds for as long as logins keep coming.
+        """
+        self._queue(user_id, when)
+        self.flush_if_due()
+
+    def _queue(self, user_id, when):
+        with self._lock:
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            previous = self._pending.get(user_id)
+            if previous is None or when > previous:
+                self._pending[user_id] = when
+
+    def is_due(self):
+        oldest = self._oldest
+        return oldest is not None and (
+            len(self._pending) >= self.max_pending or time.monotonic() - oldest >= self.max_lag
+        )
+
+    def flush_if_due(self):
+        if self.is_due():
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending, self._oldest = self._pending, {}, None
+        if not pending:
+            return 0
+        rows = list(pending.items())
+        try:
+            with transaction.atomic():
+                for start in range(0, len(rows), self.batch_size):
+                    write_last_logins(rows[start:start + self.batch_size])
+        except DatabaseError:
+            logger.exception('Writing %d last_login timestamps failed; keeping them for the next flush', len(rows))
+            for user_id, when in rows:
+                self._queue(user_id, when)
+            return 0
+        return len(rows)
+
+
+def write_last_logins(rows):
+    """
+    Set last_login for a batch of (userId, timestamp) pairs in one statement:
+    UPDATE ... FROM (VALUES ...) on PostgreSQL, a CASE-based bulk_update
+    elsewhere.
+    """
+    if connection.vendor != 'postgresql':
+        User.objects.bulk_update(
+            [User(pk=user_id, last_login=when) for user_id, when in rows], ['last_login'])
+        return
+
+    pk, field = User._meta.pk, User._meta.get_field('last_login')
+    quote = connection.ops.quote_name
+    values = ', '.join(
+        [f'(%s::{pk.db_type(connection)}, %s::{field.db_type(connection)})'] * len(rows))
+    params = []
+    for user_id, when in rows:
+        params += [pk.get_db_prep_value(user_id, connection), field.get_db_prep_value(when, connection)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {quote(User._meta.db_table)} AS u SET {quote(field.column)} = v.last_login '
+            f'FROM (VALUES {values}) AS v(id, last_login) WHERE u.{quote(pk.column)} = v.id',
+            params,
+        )
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            config = settings.LAST_LOGIN_BUFFER
+            _buffer = LastLoginBuffer(max_lag=config['MAX_LAG'], max_pending=config['MAX_PENDING'])
+            atexit.register(_flush_at_exit, _buffer)
+        return _buffer
+
+
+def _flush_at_exit(buffer):
+    try:
+        buffer.flush()
+    except Exception:
+        logger.exception('Flushing last_login timestamps at exit failed')
+
+
+def buffer_last_login(sender, user, **kwargs):
+    """
+    user_logged_in receiver standing in for Django's update_last_login.
+    """
+    if not settings.LAST_LOGIN_BUFFER['ENABLED']:
+        return update_last_login(sender, user, **kwargs)
+    user.last_login = timezone.now()
+    get_buffer().record(user.pk, user.last_login)
+
+
+def flush_last_logins(sender, **kwargs):
+    # request_finished receiver, run before close_old_connections (see
+    # api/signals.py); only touches the database once a flush is due.
+    if _buffer is not None:
+        _buffer.flush_if_due()
@@ -0,0 +1,94 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter so nothing is already imported. Prints one JSON
+# line with the phase timings, measured from interpreter start-up onwards.
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+modules_at_start = len(sys.modules)
+
+import django
+django.setup()
+setup_done = time.perf_counter()
+
+from django.core.servers.basehttp import get_internal_wsgi_application
+application = get_internal_wsgi_application()
+app_ready = time.perf_counter()
+
+from wsgiref.util import setup_testing_defaults
+environ = {'PATH_INFO': sys.argv[1], 'REQUEST_METHOD': 'GET'}
+setup_testing_defaults(environ)
+statuses = []
+body = b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+responded = time.perf_counter()
+
+print(json.dumps({
+    'setup_ms': (setup_done - started) * 1000,
+    'application_ms': (app_ready - setup_done) * 1000,
+    'first_response_ms': (responded - app_ready) * 1000,
+    'modules': len(sys.modules) - modules_at_start,
+    'status': statuses[0],
+}))
+"""
+
+PHASES = ['interpreter_ms', 'setup_ms', 'application_ms', 'first_response_ms', 'total_ms']
+
+
+def measure(settings_module, runs=5, path='/api/organisations'):
+    """
+    Cold-start `settings_module` `runs` times in fresh interpreters and
+    return the median of every phase, in milliseconds.
+    """
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module}
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', PROBE, path], env=env, cwd=settings.BASE_DIR,
+                                capture_output=True, text=True)
+        total = (time.perf_counter() - started) * 1000
+        if result.returncode:
+            raise RuntimeError(f'{settings_module} failed to start:\n{result.stderr}')
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample['total_ms'] = total
+        sample['interpreter_ms'] = total - sample['setup_ms'] - sample['application_ms'] - sample['first_response_ms']
+        samples.append(sample)
+
+    summary = {phase: round(statistics.median(s[phase] for s in samples), 2) for phase in PHASES}
+    summary['modules'] = samples[-1]['modules']
+    summary['status'] = samples[-1]['status']
+    return summary
+
+
+class Command(BaseCommand):
+    help = ("Measure cold-start latency: import/setup time, WSGI application "
+            "load (WSGI_APPLICATION, including any boot warm-up) and time to "
+            "the first response, each in a fresh interpreter.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*',
+                            help='settings modules to compare (default: the current one)')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default='/api/organisations',
+                            help='path requested as the first response')
+        parser.add_argument('--json', action='store_true', help='print the results as JSON')
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or [os.environ['DJANGO_SETTINGS_MODULE']]
+        results = {module: measure(module, options['runs'], options['path']) for module in modules}
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'settings':<26}" + ''.join(f'{phase[:-3]:>16}' for phase in PHASES) + f"{'modules':>10}")
+        for module, summary in results.items():
+            self.stdout.write(f'{module:<26}' + ''.join(f'{summary[phase]:>16.1f}' for phase in PHASES)
+                              + f"{summary['modules']:>10}")
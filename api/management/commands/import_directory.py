@@ -0,0 +1,261 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+from pathlib import Path
+from uuid import UUID, uuid4
+
+from django.contrib.auth.hashers import (UNUSABLE_PASSWORD_PREFIX,
+                                         identify_hasher, make_password)
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import bump_organisation_lists
+from api.models import Membership, Organisation, User
+
+NAME_LENGTH = Organisation._meta.get_field('name').max_length
+
+
+def read_rows(path, fmt):
+    """
+    Yield one dict per CSV row or NDJSON line, streamed from disk. An NDJSON
+    line that isn't a JSON object of strings (or nulls) yields None, so it
+    can be rejected like any other bad row without shifting the positions
+    the checkpoint counts.
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    yield parse_line(line)
+
+
+def parse_line(line):
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(row, dict) or not all(value is None or isinstance(value, str) for value in row.values()):
+        return None
+    return row
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    suffix = Path(path).suffix.lower()
+    if suffix == '.csv':
+        return 'csv'
+    if suffix in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    raise CommandError(f"Can't tell the format of {path}; pass --format.")
+
+
+def usable_hash(password):
+    if password.startswith(UNUSABLE_PASSWORD_PREFIX):
+        return True
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return False
+    return True
+
+
+def parse_uuid(value):
+    try:
+        return UUID(value)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Bulk-import users, organisations and memberships from CSV or NDJSON. "
+            "Passwords must already be hashed in Django's format. Progress is "
+            "checkpointed to --state so an interrupted import can be re-run.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', help='firstName, lastName, email, password, phone[, userId]')
+        parser.add_argument('--organisations', help='name, description, ownerEmail[, orgId]')
+        parser.add_argument('--memberships',
+                            help="orgId, email[, role]; role must be 'member', owners come from --organisations")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='input format (default: from each file extension)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--state', default='import_directory.state.json',
+                            help='checkpoint file recording how far each input got')
+        parser.add_argument('--no-default-organisations', action='store_true',
+                            help="don't give imported users the organisation registration creates")
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.default_organisations = not options['no_default_organisations']
+        self.state_path = Path(options['state'])
+        self.state = json.loads(self.state_path.read_text()) if self.state_path.exists() else {}
+
+        steps = [
+            ('users', self.import_users),
+            ('organisations', self.import_organisations),
+            ('memberships', self.import_memberships),
+        ]
+        if not any(options[kind] for kind, _ in steps):
+            raise CommandError('Pass at least one of --users, --organisations or --memberships.')
+        for kind, import_batch in steps:
+            if options[kind]:
+                self.run(kind, options[kind], detect_format(options[kind], options['format']), import_batch)
+
+    def save_state(self):
+        partial = self.state_path.with_suffix('.tmp')
+        partial.write_text(json.dumps(self.state, indent=2))
+        os.replace(partial, self.state_path)
+
+    def run(self, kind, path, fmt, import_batch):
+        key = f'{kind}:{os.path.abspath(path)}'
+        done = self.state.get(key, 0)
+        rows = islice(read_rows(path, fmt), done, None)
+        if done:
+            self.stdout.write(f'{kind}: resuming after row {done}')
+
+        totals = {'imported': 0, 'skipped': 0, 'rejected': 0}
+        processed = 0
+        started = time.perf_counter()
+        while batch := list(islice(rows, self.batch_size)):
+            # Each batch commits on its own and is checkpointed right after,
+            # so a re-run redoes at most one batch. Every insert ignores
+            # conflicts, which makes redoing it harmless.
+            rows_ok = [row for row in batch if row is not None]
+            with transaction.atomic():
+                counts = import_batch(rows_ok)
+            counts['rejected'] += len(batch) - len(rows_ok)
+            done += len(batch)
+            processed += len(batch)
+            self.state[key] = done
+            self.save_state()
+
+            for name, count in counts.items():
+                totals[name] += count
+            rate = processed / (time.perf_counter() - started)
+            self.stdout.write(f"{kind}: {done} rows, {totals['imported']} imported, "
+                              f"{totals['skipped']} skipped, {totals['rejected']} rejected, "
+                              f"{rate:.0f} rows/s")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{kind}: finished {path} ({totals['imported']} imported, "
+            f"{totals['skipped']} skipped, {totals['rejected']} rejected)"))
+
+    def import_users(self, rows):
+        users, rejected = [], 0
+        for row in rows:
+            email = (row.get('email') or '').strip()
+            first_name = (row.get('firstName') or '').strip()
+            last_name = (row.get('lastName') or '').strip()
+            password = row.get('password') or make_password(None)
+            user_id = parse_uuid(row['userId']) if row.get('userId') else uuid4()
+            if not (email and first_name and last_name and user_id) or not usable_hash(password):
+                rejected += 1
+                continue
+            users.append(User(
+                userId=user_id,
+                email=email, firstName=first_name, lastName=last_name,
+                password=password, phone=row.get('phone') or '',
+            ))
+
+        keys = [user.pk for user in users]
+        existing = set(User.objects.filter(pk__in=keys).values_list('pk', flat=True))
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        # Rows that lost to an existing email aren't there under our key, and
+        # ones whose key was already there (a redone batch) weren't inserted.
+        present = set(User.objects.filter(pk__in=keys).values_list('pk', flat=True))
+        imported = [user for user in users if user.pk in present - existing]
+        if self.default_organisations:
+            self.create_default_organisations(imported)
+        return {'imported': len(imported), 'skipped': len(users) - len(imported), 'rejected': rejected}
+
+    def create_default_organisations(self, users):
+        """
+        What registration does per user, done for a whole batch: one
+        organisation each plus the owner membership, in two inserts. A taken
+        default name gets the user's id appended, as names are unique.
+        """
+        owners = set(Organisation.objects.filter(owner__in=users).values_list('owner_id', flat=True))
+        users = [user for user in users if user.pk not in owners]
+        names = {user.pk: Organisation.default_name(user)[:NAME_LENGTH] for user in users}
+        taken = set(Organisation.objects.filter(name__in=names.values()).values_list('name', flat=True))
+
+        organisations = []
+        for user in users:
+            name = names[user.pk]
+            if name in taken:
+                name = Organisation.unique_name(name, user.pk)
+            taken.add(name)
+            organisations.append(Organisation(orgId=uuid4(), name=name, owner_id=user.pk))
+
+        Organisation.objects.bulk_create(organisations)
+        Membership.objects.bulk_create(
+            Membership(user_id=org.owner_id, organisation_id=org.pk, role=Membership.OWNER)
+            for org in organisations
+        )
+
+    def import_organisations(self, rows):
+        emails = {(row.get('ownerEmail') or '').strip() for row in rows}
+        owners = dict(User.objects.filter(email__in=emails).values_list('email', 'pk'))
+
+        organisations, rejected = [], 0
+        for row in rows:
+            name = (row.get('name') or '').strip()
+            owner_id = owners.get((row.get('ownerEmail') or '').strip())
+            org_id = parse_uuid(row['orgId']) if row.get('orgId') else uuid4()
+            if not name or len(name) > NAME_LENGTH or owner_id is None or org_id is None:
+                rejected += 1
+                continue
+            organisations.append(Organisation(
+                orgId=org_id,
+                name=name, description=row.get('description') or '', owner_id=owner_id,
+            ))
+
+        keys = [org.orgId for org in organisations]
+        existing = set(Organisation.objects.filter(orgId__in=keys).values_list('pk', flat=True))
+        Organisation.objects.bulk_create(organisations, ignore_conflicts=True)
+        present = list(Organisation.objects.filter(orgId__in=keys).values_list('pk', 'owner_id'))
+        imported = len(present) - len(existing)
+        # The owner memberships are re-inserted for existing rows too, so a
+        # batch interrupted between the two inserts is repaired on re-run.
+        Membership.objects.bulk_create(
+            (Membership(user_id=owner_id, organisation_id=pk, role=Membership.OWNER)
+             for pk, owner_id in present),
+            ignore_conflicts=True,
+        )
+        bump_organisation_lists(*{owner_id for _, owner_id in present})
+        return {'imported': imported, 'skipped': len(organisations) - imported, 'rejected': rejected}
+
+    def import_memberships(self, rows):
+        org_ids = {parse_uuid(row.get('orgId')) for row in rows}
+        emails = {(row.get('email') or '').strip() for row in rows}
+        organisations = {org_id: pk for pk, org_id in
+                         Organisation.objects.filter(orgId__in=org_ids - {None}).values_list('pk', 'orgId')}
+        users = dict(User.objects.filter(email__in=emails).values_list('email', 'pk'))
+
+        memberships, rejected = {}, 0
+        for row in rows:
+            organisation_id = organisations.get(parse_uuid(row.get('orgId')))
+            user_id = users.get((row.get('email') or '').strip())
+            # An organisation has the one owner, set by its own import.
+            role = row.get('role') or Membership.MEMBER
+            if organisation_id is None or user_id is None or role != Membership.MEMBER:
+                rejected += 1
+                continue
+            memberships[user_id, organisation_id] = Membership(
+                user_id=user_id, organisation_id=organisation_id, role=role)
+
+        # Pairs already there are skipped rather than left to ignore_conflicts,
+        # so they aren't counted as imported.
+        existing = set(Membership.objects.filter(
+            user_id__in={user_id for user_id, _ in memberships},
+            organisation_id__in={organisation_id for _, organisation_id in memberships},
+        ).values_list('user_id', 'organisation_id'))
+        new = [membership for key, membership in memberships.items() if key not in existing]
+        Membership.objects.bulk_create(new, ignore_conflicts=True)
+        bump_organisation_lists(*{membership.user_id for membership in new})
+        return {'imported': len(new), 'skipped': len(rows) - rejected - len(new), 'rejected': rejected}
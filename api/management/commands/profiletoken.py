@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from hngUser.middleware import make_profile_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed X-Profile header value that profiles one request."
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_profile_token())
@@ -0,0 +1,62 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_user_email_alter_user_firstname_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Membership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('owner', 'Owner'), ('member', 'Member')], default='member', max_length=10)),
+                ('organisation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='api.organisation')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'organisation'), name='unique_user_organisation')],
+            },
+        ),
+        # Owners become 'owner' members; everyone in the old auto-created
+        # through table becomes a plain member unless they already own the org.
+        migrations.RunSQL(
+            sql=[
+                """
+                INSERT INTO api_membership (user_id, organisation_id, role)
+                SELECT owner_id, id, 'owner' FROM api_organisation
+                """,
+                """
+                INSERT INTO api_membership (user_id, organisation_id, role)
+                SELECT t.user_id, t.organisation_id, 'member'
+                FROM api_organisation_users t
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM api_organisation o
+                    WHERE o.id = t.organisation_id AND o.owner_id = t.user_id
+                )
+                """,
+            ],
+            reverse_sql=[
+                """
+                INSERT INTO api_organisation_users (organisation_id, user_id)
+                SELECT organisation_id, user_id FROM api_membership
+                WHERE role = 'member'
+                """,
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='organisation',
+            name='users',
+        ),
+        migrations.AddField(
+            model_name='organisation',
+            name='users',
+            field=models.ManyToManyField(related_name='organisations', through='api.Membership', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
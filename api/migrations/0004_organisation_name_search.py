@@ -0,0 +1,51 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:00
+
+from django.db import migrations
+
+# Indexes behind GET /api/organisations/search, which filters with
+# name__istartswith. Neither can be expressed portably in Meta.indexes:
+#
+# - Postgres compiles istartswith to UPPER("name"::text) LIKE UPPER(...), so
+#   the index is a pg_trgm GIN index on that same expression. It serves
+#   prefix and infix (icontains) patterns alike.
+# - SQLite compiles it to "name" LIKE ... ESCAPE '\', which is
+#   case-insensitive and can use an index declared COLLATE NOCASE.
+
+POSTGRES_FORWARDS = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS api_organisation_name_trgm '
+    'ON api_organisation USING gin ((UPPER("name"::text)) gin_trgm_ops)',
+]
+SQLITE_FORWARDS = [
+    'CREATE INDEX IF NOT EXISTS api_organisation_name_nocase '
+    'ON api_organisation ("name" COLLATE NOCASE)',
+]
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'postgresql': POSTGRES_FORWARDS,
+        'sqlite': SQLITE_FORWARDS,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    index = {
+        'postgresql': 'api_organisation_name_trgm',
+        'sqlite': 'api_organisation_name_nocase',
+    }.get(schema_editor.connection.vendor)
+    if index:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_membership'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
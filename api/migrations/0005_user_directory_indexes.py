@@ -0,0 +1,57 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:49
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# The name prefix indexes behind CustomUserManager.with_name_prefix, which
+# filters with firstName/lastName__istartswith. As in 0004, neither fits
+# Meta.indexes:
+#
+# - Postgres compiles istartswith to UPPER("col"::text) LIKE UPPER(...). A
+#   btree only serves LIKE 'prefix%' with text_pattern_ops, which compares
+#   bytewise whatever the database collation is.
+# - SQLite compiles it to "col" LIKE ... ESCAPE '\', which is
+#   case-insensitive and can use an index declared COLLATE NOCASE.
+
+COLUMNS = ['firstName', 'lastName']
+
+FORWARDS = {
+    'postgresql': 'CREATE INDEX IF NOT EXISTS api_user_{name}_pattern '
+                  'ON api_user ((UPPER("{column}"::text)) text_pattern_ops)',
+    'sqlite': 'CREATE INDEX IF NOT EXISTS api_user_{name}_nocase '
+              'ON api_user ("{column}" COLLATE NOCASE)',
+}
+INDEX_NAMES = {
+    'postgresql': 'api_user_{name}_pattern',
+    'sqlite': 'api_user_{name}_nocase',
+}
+
+
+def create_prefix_indexes(apps, schema_editor):
+    statement = FORWARDS.get(schema_editor.connection.vendor)
+    if statement:
+        for column in COLUMNS:
+            schema_editor.execute(statement.format(name=column.lower(), column=column))
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    index = INDEX_NAMES.get(schema_editor.connection.vendor)
+    if index:
+        for column in COLUMNS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {index.format(name=column.lower())}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_organisation_name_search'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='api_user_email_lower'),
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
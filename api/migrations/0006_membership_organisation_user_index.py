@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_user_directory_indexes'),
+    ]
+
+    operations = [
+        # Build the composite index before dropping the one it replaces.
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['organisation', 'user'], name='api_membership_org_user'),
+        ),
+        migrations.AlterField(
+            model_name='membership',
+            name='organisation',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='api.organisation'),
+        ),
+    ]
@@ -1,8 +1,12 @@
-from uuid import uuid4
+from uuid import UUID, uuid4
 
+from django.conf import settings
 from django.contrib.auth.models import (AbstractBaseUser, BaseUserManager,
                                         PermissionsMixin)
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.functions import Lower
+
+from .cache import bump_organisation_lists
 
 # Create your models here.
 
@@ -23,6 +27,21 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(email, first_name, last_name, password, **extra_fields)
 
+    def with_email(self, email):
+        """
+        Exact, case-insensitive email match served by the lower(email) index.
+        """
+        return self.alias(email_lower=Lower('email')).filter(email_lower=email.lower())
+
+    def with_name_prefix(self, prefix):
+        """
+        Users whose first or last name starts with `prefix`, ignoring case.
+        Both sides are a LIKE 'prefix%' (istartswith), served by the
+        pattern indexes from migration 0005 rather than a range, which
+        only holds under the C collation.
+        """
+        return self.filter(models.Q(firstName__istartswith=prefix) | models.Q(lastName__istartswith=prefix))
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     userId = models.UUIDField(primary_key=True, unique=True, default=uuid4, editable=False)
@@ -36,17 +55,157 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
-    
+
+    class Meta:
+        # Backing CustomUserManager.with_email; the name prefix indexes are
+        # per-database and live in migration 0005.
+        indexes = [
+            models.Index(Lower('email'), name='api_user_email_lower'),
+        ]
+
     def __str__(self):
         return self.email
 
 
+class OrganisationManager(models.Manager):
+    # Organisation.save() adds the owner's membership, so these are plain
+    # creates; they are kept as the named entry points for the views.
+    def create_organisation(self, owner, **fields):
+        return self.create(owner=owner, **fields)
+
+    async def acreate_organisation(self, owner, **fields):
+        return await self.acreate(owner=owner, **fields)
+
+
 class Organisation(models.Model):
     orgId = models.UUIDField(unique=True, default=uuid4, editable=False)
     name = models.CharField(null=False, max_length=100, unique=True)
     description = models.CharField(blank=True, max_length=250)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orgs_created', null=False)
-    users = models.ManyToManyField(User, related_name='organisations')
+    users = models.ManyToManyField(User, related_name='organisations', through='Membership')
+
+    objects = OrganisationManager()
     
     def __str__(self) -> str:
         return self.name
+
+    def save(self, *args, **kwargs):
+        """
+        Save, and make sure the owner holds an OWNER membership in the same
+        transaction, so an organisation is always listed for its owner
+        whichever path created it (the views, the admin, a script). A
+        previous owner stays a member, demoted to MEMBER.
+        bulk_create() skips this; callers add the memberships themselves.
+        """
+        adding = self._state.adding
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        # No savepoint: inside a caller's transaction (registration) this
+        # costs no extra round trips, and a failure rolls back the caller.
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            memberships = Membership.objects.using(self._state.db)
+            if adding:
+                memberships.create(user_id=self.owner_id, organisation=self, role=Membership.OWNER)
+                member_ids = [self.owner_id]
+            else:
+                memberships.filter(organisation=self, role=Membership.OWNER).exclude(
+                    user_id=self.owner_id).update(role=Membership.MEMBER)
+                memberships.update_or_create(user_id=self.owner_id, organisation=self,
+                                             defaults={'role': Membership.OWNER})
+                # Every member's cached list shows the name and description.
+                member_ids = []
+                if settings.ORG_LIST_CACHE['ENABLED']:
+                    member_ids = list(memberships.filter(organisation=self)
+                                      .values_list('user_id', flat=True))
+        bump_organisation_lists(*member_ids)
+
+    @staticmethod
+    def default_name(user):
+        # The organisation every new user gets; see RegisterUserSerializer.
+        return f"{user.firstName}'s Organisaton"
+
+    @staticmethod
+    def unique_name(name, user_id):
+        # `name` suffixed with the owner's id, for when it is already taken.
+        suffix = f" ({user_id.hex[:12]})"
+        return name[:Organisation._meta.get_field('name').max_length - len(suffix)] + suffix
+
+    def member_rows(self):
+        """
+        This organisation's members, owner included, as dicts holding the
+        UserSerializer fields and the member's role. One query for any
+        number of rows; the password hash is never read.
+        """
+        return self.memberships.values(
+            'role',
+            userId=models.F('user_id'),
+            firstName=models.F('user__firstName'),
+            lastName=models.F('user__lastName'),
+            email=models.F('user__email'),
+            phone=models.F('user__phone'),
+        )
+
+    def add_members(self, user_ids):
+        """
+        Add every existing user in `user_ids` as a member using one lookup
+        query and one batched insert. Returns the outcome for each id as
+        given: 'added', 'already_member' or 'unknown'.
+        """
+        results = {}
+        parsed = {}
+        for raw in user_ids:
+            try:
+                parsed[str(raw)] = UUID(str(raw))
+            except ValueError:
+                results[str(raw)] = 'unknown'
+
+        found = dict(
+            User.objects.filter(userId__in=set(parsed.values()))
+            .annotate(is_member=models.Exists(
+                Membership.objects.filter(organisation=self, user=models.OuterRef('pk'))))
+            .values_list('userId', 'is_member')
+        )
+        added = [user_id for user_id, is_member in found.items() if not is_member]
+        Membership.objects.bulk_create(
+            [Membership(user_id=user_id, organisation=self) for user_id in added],
+            ignore_conflicts=True,
+        )
+        bump_organisation_lists(*added)
+
+        for raw, user_id in parsed.items():
+            if user_id not in found:
+                results[raw] = 'unknown'
+            elif found[user_id]:
+                results[raw] = 'already_member'
+            else:
+                results[raw] = 'added'
+        return results
+
+
+class Membership(models.Model):
+    OWNER = 'owner'
+    MEMBER = 'member'
+    ROLE_CHOICES = [
+        (OWNER, 'Owner'),
+        (MEMBER, 'Member'),
+    ]
+
+    # The (user, organisation) unique index below covers lookups by user and
+    # the (organisation, user) index covers lookups by organisation, so
+    # neither FK needs an index of its own.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='memberships', db_index=False)
+    organisation = models.ForeignKey(Organisation, on_delete=models.CASCADE, related_name='memberships',
+                                     db_index=False)
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES, default=MEMBER)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'organisation'], name='unique_user_organisation'),
+        ]
+        indexes = [
+            # Member listings page through an organisation in user order.
+            models.Index(fields=['organisation', 'user'], name='api_membership_org_user'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user} in {self.organisation} ({self.role})"
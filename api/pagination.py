@@ -0,0 +1,34 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OrganisationCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the organisation primary key. Cursors are opaque
+    and each page is a `WHERE id > cursor ORDER BY id LIMIT n` range scan,
+    so deep pages cost the same as the first one.
+    """
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 500
+    ordering = 'id'
+
+
+class UserDirectoryPagination(CursorPagination):
+    """
+    Keyset pagination for the user directory, ordered by the unique email.
+    """
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 500
+    ordering = 'email'
+
+
+class OrganisationMemberPagination(CursorPagination):
+    """
+    Keyset pagination over an organisation's members in user order, walking
+    the (organisation, user) membership index.
+    """
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 500
+    ordering = 'userId'
@@ -8,4 +8,12 @@ class isOwner(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # Check if the object's creator is the same as the current user
-        return obj.owner == request.user
\ No newline at end of file
+        return obj.owner_id == request.user.pk
+
+class isSuperuser(permissions.BasePermission):
+    """
+    Only superusers; the User model has no is_staff flag.
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_superuser)
@@ -1,7 +1,8 @@
-from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
 from rest_framework.serializers import (CharField, EmailField, ModelSerializer,
-                                        Serializer)
+                                        Serializer, ValidationError)
 
+from . import hashing
 from .models import Organisation, User
 
 
@@ -17,6 +18,13 @@ class UserSerializer(ModelSerializer):
         ]
 
 
+class OrganisationMemberSerializer(UserSerializer):
+    role = CharField(read_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['role']
+
+
 class OrganisationSerializer(ModelSerializer):
     class Meta:
         model = Organisation
@@ -27,7 +35,7 @@ class OrganisationSerializer(ModelSerializer):
         ]
     
     def create(self, validated_data):
-        org = Organisation.objects.create(owner=self.context.get('request').user, **validated_data)
+        org = Organisation.objects.create_organisation(owner=self.context.get('request').user, **validated_data)
         return org
     
 
@@ -47,10 +55,45 @@ class RegisterUserSerializer(ModelSerializer):
             'password',
             'phone'
         ]
+        # Uniqueness is left to the database; see register().
+        extra_kwargs = {'email': {'validators': []}}
 
     def create(self, validated_data):
-        validated_data['password'] =  make_password(password=validated_data.get('password'))
-        user = User.objects.create(**validated_data)
-    
+        validated_data['password'] = hashing.make_password(validated_data.get('password'))
+        return self.register(validated_data)
+
+    @staticmethod
+    def register(validated_data):
+        """
+        Insert the user, their default organisation and its owner membership
+        in one transaction. `validated_data` carries an already hashed
+        password. A taken email surfaces as the unique constraint's
+        IntegrityError and is turned into a ValidationError. A taken default
+        organisation name (another user with the same first name) is retried
+        once under a name suffixed with the new user's id.
+        """
+        try:
+            return RegisterUserSerializer.insert(validated_data, unique_org_name=False)
+        except IntegrityError:
+            RegisterUserSerializer.reject_taken_email(validated_data)
+        try:
+            return RegisterUserSerializer.insert(validated_data, unique_org_name=True)
+        except IntegrityError:
+            RegisterUserSerializer.reject_taken_email(validated_data)
+            raise
+
+    @staticmethod
+    def insert(validated_data, unique_org_name):
+        with transaction.atomic():
+            user = User.objects.create(**validated_data)
+            name = Organisation.default_name(user)
+            if unique_org_name:
+                name = Organisation.unique_name(name, user.pk)
+            Organisation.objects.create_organisation(owner=user, name=name)
         return user
-        # return super(RegisterUserSerializer, self).create(validated_data)
+
+    @staticmethod
+    def reject_taken_email(validated_data):
+        # Only failed registrations pay for finding out which constraint it was.
+        if User.objects.filter(email=validated_data['email']).exists():
+            raise ValidationError({'email': ['user with this email already exists.']})
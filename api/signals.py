@@ -0,0 +1,40 @@
+from django.contrib.auth.signals import user_logged_in
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import user_cache, user_cache_key
+from .last_login import buffer_last_login, flush_last_logins
+from .models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.delete(user_cache_key(getattr(instance, api_settings.USER_ID_FIELD)))
+
+
+@receiver(pre_save, sender=User)
+def invalidate_previous_cached_user(sender, instance, using=None, update_fields=None, **kwargs):
+    # Tokens carry USER_ID_FIELD (the email), so changing it leaves the entry
+    # under the old value serving old tokens. Read the stored value and drop
+    # that entry too, unless the save can't touch the field.
+    field = api_settings.USER_ID_FIELD
+    if instance._state.adding or (update_fields is not None and field not in update_fields):
+        return
+    previous = sender._base_manager.using(using).filter(pk=instance.pk).values_list(field, flat=True).first()
+    if previous is not None and previous != getattr(instance, field):
+        user_cache.delete(user_cache_key(previous))
+
+
+# Swap django.contrib.auth's per-login UPDATE for the write-behind buffer in
+# api/last_login.py; buffer_last_login falls back to it when the buffer is off.
+user_logged_in.disconnect(dispatch_uid='update_last_login')
+user_logged_in.connect(buffer_last_login, dispatch_uid='update_last_login')
+request_finished.connect(flush_last_logins, dispatch_uid='flush_last_logins')
+# Receivers run in connection order and django.db connected
+# close_old_connections first; move it behind the flush so the flush uses the
+# request's connection instead of opening one that outlives the request.
+request_finished.disconnect(close_old_connections)
+request_finished.connect(close_old_connections)
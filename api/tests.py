@@ -1,19 +1,74 @@
+import contextvars
 import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+from unittest import addModuleCleanup, mock, skipUnless
+from uuid import uuid4
 
 from django.conf import settings
-from django.test import Client, TestCase
+from django.contrib.auth.hashers import (check_password, make_password,
+                                         verify_password)
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import (IntegrityError, OperationalError, close_old_connections,
+                       connection, connections)
+from django.db.backends.postgresql import base as postgresql_backend
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (Client, SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from jwt import decode
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import SerializerMethodField
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
 
-from api.models import Organisation, User
+from api.authentication import user_cache
+from api.cache import (DjangoCacheBackend, OrganisationListCache,
+                       get_organisation_list_cache)
+from api.fast_serializers import compile_serializer
+from api.hashing import HashingUnavailable, PasswordHashingPool
+from api.last_login import LastLoginBuffer, write_last_logins
+from api.models import Membership, Organisation, User
+from api.serializers import (OrganisationMemberSerializer,
+                             OrganisationSerializer, UserSerializer)
+from hngUser.db.pooled import base as pooled_backend
+from hngUser.db.pooled.base import close_pools, pool_stats
+from hngUser.db.pooled.pool import ConnectionPool, PoolTimeout
+from hngUser import settings_api
+from hngUser.middleware import ReplicaRoutingMiddleware, make_profile_token
+from hngUser.routers import (STICKY_COOKIE, PrimaryReplicaRouter, Routing,
+                             _routing, replica_aliases, routing, use_primary)
+from hngUser.warmup import warm_up
 
 # Create your tests here.
 
 jwt_decode_handler = JWTAuthentication()
 
 
+def setUpModule():
+    # Sampled SQL log lines would land in the test output at random; the
+    # tests that check them turn sampling back on for themselves.
+    quiet = override_settings(SQL_INSTRUMENTATION_SAMPLE_RATE=0)
+    quiet.enable()
+    addModuleCleanup(quiet.disable)
+
+
 class UserRegistrationTests(TestCase):
 
     def setUp(self):
@@ -89,6 +144,39 @@ class UserRegistrationTests(TestCase):
         self.assertIn('user with this email already exists.',
                       response.data['errors']['email'])
 
+    def test_register_runs_three_inserts_in_one_transaction(self):
+        # SAVEPOINT / RELEASE stand in for BEGIN / COMMIT inside TestCase.
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.register_url,
+                                        data=json.dumps(self.user_data),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        statements = [query['sql'].split()[0] for query in ctx.captured_queries]
+        self.assertEqual(statements, ['SAVEPOINT', 'INSERT', 'INSERT', 'INSERT', 'RELEASE'])
+
+    def test_same_first_name_gets_a_suffixed_organisation(self):
+        self.client.post(self.register_url,
+                         data=json.dumps(self.user_data),
+                         content_type='application/json')
+        # Same first name, so the default organisation's name is taken.
+        clashing = dict(self.user_data, email='john.other@example.com')
+        response = self.client.post(self.register_url,
+                                    data=json.dumps(clashing),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = User.objects.get(email='john.other@example.com')
+        org = Organisation.objects.get(owner=user)
+        self.assertEqual(org.name, f"John's Organisaton ({user.pk.hex[:12]})")
+        self.assertEqual(Organisation.objects.filter(name="John's Organisaton").count(), 1)
+
+    def test_failed_organisation_insert_leaves_no_user(self):
+        with mock.patch.object(Organisation.objects, 'create', side_effect=IntegrityError):
+            response = Client(raise_request_exception=False).post(self.register_url,
+                                                                   data=json.dumps(self.user_data),
+                                                                   content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertFalse(User.objects.filter(email=self.user_data['email']).exists())
+
 
 class UserLoginTests(TestCase):
 
@@ -215,3 +303,1799 @@ class OrganisationTest(TestCase):
         
         response = self.client.get(reverse('org_details', args=[user2_org.orgId]), **headers)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OwnerMembershipTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(email="owner@example.com", firstName="Own", lastName="Er")
+
+    def test_plain_create_makes_the_owner_a_member(self):
+        org = Organisation.objects.create(name="Acme", owner=self.owner)
+        self.assertEqual(list(org.memberships.values_list('user', 'role')),
+                         [(self.owner.pk, Membership.OWNER)])
+        self.assertTrue(Organisation.objects.filter(memberships__user=self.owner, pk=org.pk).exists())
+
+    def test_changing_the_owner_makes_them_an_owner_member(self):
+        org = Organisation.objects.create(name="Acme", owner=self.owner)
+        member = User.objects.create(email="member@example.com", firstName="Mem", lastName="Ber")
+        org.add_members([str(member.pk)])
+
+        org.owner = member
+        org.save()
+
+        self.assertEqual(dict(org.memberships.values_list('user', 'role')),
+                         {member.pk: Membership.OWNER, self.owner.pk: Membership.MEMBER})
+
+    async def test_async_create_makes_the_owner_a_member(self):
+        org = await Organisation.objects.acreate_organisation(name="Acme", owner=self.owner)
+        self.assertTrue(await org.memberships.filter(user=self.owner, role=Membership.OWNER).aexists())
+
+
+class MembershipMigrationTests(TransactionTestCase):
+    """
+    Migration 0003 copies the auto-created organisation/user table into
+    Membership, and its reversal copies the plain members back.
+    """
+    before = [('api', '0002_alter_user_email_alter_user_firstname_and_more')]
+    after = [('api', '0003_membership')]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.before)
+        self.executor.loader.build_graph()
+        apps = self.executor.loader.project_state(self.before).apps
+        User, Organisation = apps.get_model('api', 'User'), apps.get_model('api', 'Organisation')
+        self.owner = User.objects.create(email="owner@example.com", firstName="Own", lastName="Er")
+        self.member = User.objects.create(email="member@example.com", firstName="Mem", lastName="Ber")
+        org = Organisation.objects.create(name="Acme", owner=self.owner)
+        # Owners could add themselves too; the copy keeps one 'owner' row.
+        org.users.add(self.owner, self.member)
+        self.org_id = org.pk
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self, targets):
+        self.executor.migrate(targets)
+        self.executor.loader.build_graph()
+        return self.executor.loader.project_state(targets).apps
+
+    def test_copies_owners_and_members_and_back(self):
+        apps = self.migrate(self.after)
+        memberships = apps.get_model('api', 'Membership').objects.filter(organisation_id=self.org_id)
+        self.assertEqual(sorted(memberships.values_list('user_id', 'role')), sorted([
+            (self.owner.pk, 'owner'),
+            (self.member.pk, 'member'),
+        ]))
+
+        # Before 0003, owners were found through Organisation.owner, so only
+        # plain members go back into the users table.
+        apps = self.migrate(self.before)
+        org = apps.get_model('api', 'Organisation').objects.get(pk=self.org_id)
+        self.assertEqual(org.owner_id, self.owner.pk)
+        self.assertEqual(list(org.users.values_list('pk', flat=True)), [self.member.pk])
+
+
+class PasswordHashingPoolTests(TestCase):
+
+    def test_inline_pool_hashes_on_calling_thread(self):
+        pool = PasswordHashingPool(workers=0, max_pending=1, timeout=1)
+        encoded = pool.run(make_password, 'password123')
+        self.assertTrue(check_password('password123', encoded))
+
+    def test_pool_rejects_work_beyond_queue_depth(self):
+        pool = PasswordHashingPool(workers=1, max_pending=1, timeout=5)
+        try:
+            pool.submit(time.sleep, 1)
+            with self.assertRaises(HashingUnavailable):
+                pool.submit(time.sleep, 1)
+        finally:
+            pool.shutdown()
+
+    def test_pool_times_out_slow_hashes(self):
+        pool = PasswordHashingPool(workers=1, max_pending=2, timeout=0.01)
+        try:
+            with self.assertRaises(HashingUnavailable):
+                pool.run(time.sleep, 1)
+        finally:
+            pool.shutdown()
+
+    def test_pool_verifies_passwords(self):
+        pool = PasswordHashingPool(workers=1, max_pending=2, timeout=30)
+        try:
+            encoded = pool.run(make_password, 'password123')
+            is_correct, _ = pool.run(verify_password, 'password123', encoded)
+            self.assertTrue(is_correct)
+        finally:
+            pool.shutdown()
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.client = Client()
+        self.user_data = {
+            "firstName": "John",
+            "lastName": "Doe",
+            "email": "john@example.com",
+            "password": "password123",
+            "phone": "08012345678"
+        }
+        response = self.client.post(reverse('register'),
+                                    data=json.dumps(self.user_data),
+                                    content_type='application/json')
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {response.data['data']['accessToken']}"}
+
+    def user_queries(self, queries):
+        return [q['sql'] for q in queries if 'FROM "api_user"' in q['sql']]
+
+    def test_warm_cache_runs_no_user_queries(self):
+        self.client.get(reverse('organisations'), **self.headers)
+        misses = user_cache.misses
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('organisations'), **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.user_queries(ctx.captured_queries), [])
+        self.assertEqual(user_cache.misses, misses)
+        self.assertGreaterEqual(user_cache.hits, 1)
+
+    def test_saving_user_invalidates_cache(self):
+        self.client.get(reverse('organisations'), **self.headers)
+        user = User.objects.get(email=self.user_data['email'])
+        user.firstName = 'Johnny'
+        user.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('organisations'), **self.headers)
+
+        self.assertEqual(len(self.user_queries(ctx.captured_queries)), 1)
+        self.assertEqual(response.data['message'], "Johnny's Organisations")
+
+    def test_old_tokens_stop_working_after_an_email_change(self):
+        self.client.get(reverse('organisations'), **self.headers)
+        user = User.objects.get(email=self.user_data['email'])
+        user.email = 'johnny@example.com'
+        user.save()
+
+        response = self.client.get(reverse('organisations'), **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_saves_that_skip_the_email_skip_the_lookup(self):
+        user = User.objects.get(email=self.user_data['email'])
+        with CaptureQueriesContext(connection) as ctx:
+            user.save(update_fields=['firstName'])
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    @override_settings(JWT_USER_CACHE={"ENABLED": False, "MAX_SIZE": 1024, "TTL": 300})
+    def test_cache_can_be_bypassed(self):
+        self.client.get(reverse('organisations'), **self.headers)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('organisations'), **self.headers)
+
+        self.assertEqual(len(self.user_queries(ctx.captured_queries)), 1)
+
+
+class OrganisationPaginationTests(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        response = self.client.post(reverse('register'),
+                                    data=json.dumps({
+                                        "firstName": "John",
+                                        "lastName": "Doe",
+                                        "email": "john@example.com",
+                                        "password": "password123",
+                                        "phone": "08012345678"
+                                    }),
+                                    content_type='application/json')
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {response.data['data']['accessToken']}"}
+        owner = User.objects.get(email="john@example.com")
+        for i in range(4):
+            Organisation.objects.create_organisation(name=f"Org {i}", owner=owner)
+
+    def test_cursor_pages_cover_every_organisation_once(self):
+        url = reverse('organisations') + '?limit=2'
+        seen = []
+        pages = 0
+        while url:
+            response = self.client.get(url, **self.headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.data['data']
+            self.assertLessEqual(len(data['organisations']), 2)
+            if pages == 0:
+                self.assertIsNone(data['previous'])
+            seen += [org['orgId'] for org in data['organisations']]
+            url = data['next']
+            pages += 1
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_invalid_cursor_is_a_client_error(self):
+        response = self.client.get(reverse('organisations') + '?cursor=garbage', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OrganisationSearchTests(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        response = self.client.post(reverse('register'),
+                                    data=json.dumps({
+                                        "firstName": "John",
+                                        "lastName": "Doe",
+                                        "email": "john@example.com",
+                                        "password": "password123",
+                                        "phone": "08012345678"
+                                    }),
+                                    content_type='application/json')
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {response.data['data']['accessToken']}"}
+        owner = User.objects.get(email="john@example.com")
+        for name in ["Acme Labs", "acme Foods", "Globex", "Initech Acme"]:
+            Organisation.objects.create_organisation(name=name, owner=owner)
+        stranger = User.objects.create(email="jane@example.com", firstName="Jane", lastName="Doe")
+        Organisation.objects.create_organisation(name="Acme Rival", owner=stranger)
+
+    def search(self, query):
+        return self.client.get(reverse('organisations_search'), {'q': query}, **self.headers)
+
+    def test_matches_name_prefix_ignoring_case(self):
+        response = self.search('ACME')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = sorted(org['name'] for org in response.data['data']['organisations'])
+        self.assertEqual(names, ["Acme Labs", "acme Foods"])
+
+    def test_pages_through_results(self):
+        response = self.client.get(reverse('organisations_search'), {'q': 'a', 'limit': 1}, **self.headers)
+        self.assertEqual(len(response.data['data']['organisations']), 1)
+        response = self.client.get(response.data['data']['next'], **self.headers)
+        self.assertEqual(len(response.data['data']['organisations']), 1)
+        self.assertIsNone(response.data['data']['next'])
+
+    def test_missing_query_is_a_client_error(self):
+        self.assertEqual(self.search('').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search('x' * 101).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserDirectoryTests(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        response = self.client.post(reverse('register'),
+                                    data=json.dumps({
+                                        "firstName": "John",
+                                        "lastName": "Doe",
+                                        "email": "john@example.com",
+                                        "password": "password123",
+                                        "phone": "08012345678"
+                                    }),
+                                    content_type='application/json')
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {response.data['data']['accessToken']}"}
+        for email, first, last in [("ada@example.com", "Ada", "Lovelace"),
+                                   ("alan@example.com", "Alan", "Turing"),
+                                   ("grace@example.com", "Grace", "Adams")]:
+            User.objects.create(email=email, firstName=first, lastName=last)
+
+    def directory(self, **params):
+        return self.client.get(reverse('users_search'), params, **self.headers)
+
+    def test_exact_email_ignores_case(self):
+        response = self.directory(email="ADA@example.com")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        users = response.data['data']['users']
+        self.assertEqual([user['email'] for user in users], ["ada@example.com"])
+        self.assertEqual(set(users[0]), set(UserSerializer.Meta.fields))
+
+    def test_name_prefix_matches_first_or_last_name(self):
+        response = self.directory(q="ad")
+        emails = [user['email'] for user in response.data['data']['users']]
+        self.assertEqual(emails, ["ada@example.com", "grace@example.com"])
+
+    def test_missing_search_term_is_a_client_error(self):
+        self.assertEqual(self.directory().status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lookups_use_the_lower_indexes(self):
+        self.assertIn('api_user_email_lower', User.objects.with_email("ada@example.com").explain())
+        plan = User.objects.with_name_prefix("ad").explain()
+        suffix = 'pattern' if connection.vendor == 'postgresql' else 'nocase'
+        self.assertIn(f'api_user_firstname_{suffix}', plan)
+        self.assertIn(f'api_user_lastname_{suffix}', plan)
+
+    def test_name_prefix_with_punctuation(self):
+        User.objects.create(email="obrien@example.com", firstName="Conan", lastName="O'Brien")
+        User.objects.create(email="oz@example.com", firstName="Ozzy", lastName="Osbourne")
+        User.objects.create(email="under@example.com", firstName="Adam", lastName="A_b")
+        self.assertEqual([user.email for user in User.objects.with_name_prefix("o'")],
+                         ["obrien@example.com"])
+        self.assertEqual([user.email for user in User.objects.with_name_prefix("A_")],
+                         ["under@example.com"])
+        self.assertFalse(User.objects.with_name_prefix("\U0010ffff").exists())
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create(email="admin@example.com", firstName="Ad", lastName="Min",
+                                         is_superuser=True)
+        self.member = User.objects.create(email="member@example.com", firstName="Mem", lastName="Ber")
+        for i in range(3):
+            org = Organisation.objects.create_organisation(name=f"Org {i}", owner=self.admin)
+            org.add_members([str(self.member.userId)])
+        self.client = Client()
+
+    def headers(self, user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(user).access_token}"}
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_organisations_as_ndjson(self):
+        response = self.client.get(reverse('export_organisations'), **self.headers(self.admin))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['name'] for row in rows], ["Org 0", "Org 1", "Org 2"])
+        self.assertEqual(rows[0]['ownerId'], str(self.admin.userId))
+
+    def test_members_as_csv(self):
+        response = self.client.get(reverse('export_members'), {'output': 'csv'}, **self.headers(self.admin))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = self.read(response).splitlines()
+        self.assertEqual(lines[0], 'orgId,userId,email,firstName,lastName,role')
+        self.assertEqual(len(lines), 1 + 6)
+        self.assertEqual(sum(line.endswith(',owner') for line in lines), 3)
+
+    def test_unknown_output_is_a_client_error(self):
+        response = self.client.get(reverse('export_members'), {'output': 'xml'}, **self.headers(self.admin))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_superuser(self):
+        response = self.client.get(reverse('export_organisations'), **self.headers(self.member))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class OrganisationMembersTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(email="owner@example.com", firstName="Own", lastName="Er",
+                                         password=make_password("password123"))
+        self.org = Organisation.objects.create_organisation(name="Big Org", owner=self.owner)
+        User.objects.bulk_create(
+            User(email=f"member{i}@example.com", firstName="Mem", lastName=str(i), password="!")
+            for i in range(250))
+        self.org.add_members([str(pk) for pk in User.objects.exclude(pk=self.owner.pk)
+                              .values_list('pk', flat=True)])
+        self.url = reverse('add_user', args=[self.org.orgId])
+        self.client = Client()
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(self.owner).access_token}"}
+
+    def test_pages_cover_every_member_once(self):
+        url = self.url + '?limit=100'
+        seen, roles = [], {}
+        while url:
+            response = self.client.get(url, **self.headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            for member in response.data['data']['users']:
+                seen.append(member['userId'])
+                roles[member['email']] = member['role']
+            url = response.data['data']['next']
+
+        self.assertEqual(len(seen), 251)
+        self.assertEqual(len(set(seen)), 251)
+        self.assertEqual(roles["owner@example.com"], "owner")
+        self.assertNotIn('password', response.data['data']['users'][0])
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.client.get(self.url, **self.headers)  # fill the JWT user cache
+        for limit in (10, 500):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(self.url, {'limit': limit}, **self.headers)
+            self.assertEqual(len(response.data['data']['users']), min(limit, 251))
+            # The organisation/membership check and the page itself.
+            self.assertEqual(len(ctx.captured_queries), 2)
+            self.assertFalse(any('password' in query['sql'] for query in ctx.captured_queries))
+
+    def test_non_members_cannot_list(self):
+        outsider = User.objects.create(email="outsider@example.com", firstName="Out", lastName="Sider")
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(outsider).access_token}"}
+        response = self.client.get(self.url, **headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(ROOT_URLCONF='hngUser.asgi_urls')
+    async def test_async_listing(self):
+        response = await self.async_client.get(self.url, {'limit': 5}, headers={
+            "AUTHORIZATION": self.headers["HTTP_AUTHORIZATION"]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['data']['users']), 5)
+        self.assertIsNotNone(response.json()['data']['next'])
+
+
+class ImportDirectoryTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.state = os.path.join(self.directory, 'state.json')
+        self.password = make_password("password123")
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as handle:
+            handle.write(text)
+        return path
+
+    def import_directory(self, **options):
+        out = StringIO()
+        call_command('import_directory', state=self.state, batch_size=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_imports_users_with_default_organisations(self):
+        User.objects.create(email="taken@example.com", firstName="Taken", lastName="User")
+        users = self.write('users.csv', "firstName,lastName,email,password,phone\n"
+                           f"John,Doe,john@example.com,{self.password},0801\n"
+                           f"John,Roe,john.roe@example.com,{self.password},0802\n"
+                           f"Taken,Again,taken@example.com,{self.password},\n"
+                           "Plain,Text,plain@example.com,password123,\n")
+        output = self.import_directory(users=users)
+
+        self.assertIn("users: finished", output)
+        self.assertIn("rows/s", output)
+        self.assertIn("2 imported, 1 skipped, 1 rejected", output)
+        john = User.objects.get(email="john.roe@example.com")
+        self.assertTrue(john.check_password("password123"))
+        names = sorted(Organisation.objects.filter(owner__lastName__in=["Doe", "Roe"]).values_list('name', flat=True))
+        self.assertEqual(names[0], "John's Organisaton")
+        self.assertTrue(names[1].startswith("John's Organisaton ("))
+        self.assertEqual(Membership.objects.filter(user=john, role=Membership.OWNER).count(), 1)
+
+        response = Client().post(reverse('login'),
+                                 data=json.dumps({"email": "john@example.com", "password": "password123"}),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_resumes_from_the_checkpoint(self):
+        users = self.write('users.ndjson', "".join(
+            json.dumps({"firstName": f"User{i}", "lastName": "Doe", "email": f"user{i}@example.com",
+                        "password": self.password}) + "\n"
+            for i in range(5)))
+        with open(self.state, 'w') as handle:
+            json.dump({f"users:{os.path.abspath(users)}": 4}, handle)
+
+        output = self.import_directory(users=users)
+        self.assertIn("resuming after row 4", output)
+        self.assertEqual(list(User.objects.values_list('email', flat=True)), ["user4@example.com"])
+
+        self.import_directory(users=users)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_imports_memberships(self):
+        owner = User.objects.create(email="owner@example.com", firstName="Own", lastName="Er")
+        member = User.objects.create(email="member@example.com", firstName="Mem", lastName="Ber")
+        org = Organisation.objects.create_organisation(name="Acme", owner=owner)
+        memberships = self.write('memberships.ndjson',
+                                 json.dumps({"orgId": str(org.orgId), "email": "member@example.com"}) + "\n"
+                                 + json.dumps({"orgId": str(org.orgId), "email": "nobody@example.com"}) + "\n")
+        output = self.import_directory(memberships=memberships)
+
+        self.assertIn("1 imported, 0 skipped, 1 rejected", output)
+        self.assertTrue(Membership.objects.filter(user=member, organisation=org,
+                                                  role=Membership.MEMBER).exists())
+
+    def test_owner_memberships_are_rejected(self):
+        owner = User.objects.create(email="owner@example.com", firstName="Own", lastName="Er")
+        member = User.objects.create(email="member@example.com", firstName="Mem", lastName="Ber")
+        org = Organisation.objects.create_organisation(name="Acme", owner=owner)
+        memberships = self.write('memberships.ndjson',
+                                 json.dumps({"orgId": str(org.orgId), "email": "member@example.com",
+                                             "role": Membership.OWNER}) + "\n")
+        output = self.import_directory(memberships=memberships)
+
+        self.assertIn("0 imported, 0 skipped, 1 rejected", output)
+        self.assertFalse(Membership.objects.filter(user=member).exists())
+
+    def test_existing_rows_are_skipped_not_imported(self):
+        owner = User.objects.create(email="owner@example.com", firstName="Own", lastName="Er")
+        User.objects.create(email="member@example.com", firstName="Mem", lastName="Ber")
+        org = Organisation.objects.create_organisation(name="Acme", owner=owner)
+        memberships = self.write('memberships.csv', "orgId,email\n"
+                                 f"{org.orgId},member@example.com\n"
+                                 f"{org.orgId},owner@example.com\n")
+        organisations = self.write('organisations.csv', "orgId,name,ownerEmail\n"
+                                   f"{org.orgId},Acme,owner@example.com\n"
+                                   f"{uuid4()},Beta,owner@example.com\n")
+        output = self.import_directory(memberships=memberships, organisations=organisations)
+
+        organisations_done, memberships_done = [line for line in output.splitlines() if ': finished' in line]
+        self.assertIn("(1 imported, 1 skipped, 0 rejected)", organisations_done)
+        self.assertIn("(1 imported, 1 skipped, 0 rejected)", memberships_done)
+        self.assertEqual(Membership.objects.get(user=owner, organisation=org).role, Membership.OWNER)
+
+    def test_malformed_ndjson_rows_are_rejected(self):
+        owner = User.objects.create(email="owner@example.com", firstName="Own", lastName="Er")
+        User.objects.create(email="member@example.com", firstName="Mem", lastName="Ber")
+        org = Organisation.objects.create_organisation(name="Acme", owner=owner)
+        memberships = self.write('memberships.ndjson', "\n".join([
+            json.dumps({"orgId": str(org.orgId), "email": "member@example.com"}),
+            '{"orgId": ',
+            '["not", "an", "object"]',
+            json.dumps({"orgId": 12345, "email": "member@example.com"}),
+            json.dumps({"orgId": str(org.orgId), "email": ["member@example.com"]}),
+        ]) + "\n")
+        output = self.import_directory(memberships=memberships)
+
+        self.assertIn("1 imported, 0 skipped, 4 rejected", output)
+        self.assertEqual(org.users.count(), 2)
+
+
+@override_settings(ROOT_URLCONF='hngUser.asgi_urls')
+class AsyncViewTests(TestCase):
+
+    user_data = {
+        "firstName": "John",
+        "lastName": "Doe",
+        "email": "john@example.com",
+        "password": "password123",
+        "phone": "08012345678"
+    }
+
+    async def register(self, data):
+        return await self.async_client.post(reverse('register'),
+                                            data=json.dumps(data),
+                                            content_type='application/json')
+
+    async def test_register_with_a_form_body(self):
+        # The async views parse the same content types as DRF's views.
+        response = await self.async_client.post(reverse('register'), data=self.user_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    async def test_malformed_json_is_a_parse_error(self):
+        response = await self.async_client.post(reverse('register'), data='{"firstName":',
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('JSON parse error', response.json()['detail'])
+
+    @override_settings(DEBUG=True, SQL_INSTRUMENTATION_SAMPLE_RATE=1.0,
+                       PROFILING={**settings.PROFILING, 'ENABLED': True})
+    @mock.patch('hngUser.middleware.replica_aliases', return_value=['replica0'])
+    def test_middleware_runs_natively_under_asgi(self, replica_aliases):
+        # Django logs each middleware it has to adapt between sync and async.
+        for middleware in [settings.MIDDLEWARE, settings_api.MIDDLEWARE]:
+            with self.subTest(middleware=middleware), override_settings(MIDDLEWARE=middleware), \
+                    self.assertNoLogs('django.request', level='DEBUG'):
+                ASGIHandler()
+
+    async def test_header_middleware_runs_on_async_requests(self):
+        response = await self.async_client.get(reverse('ready'))
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+
+    @override_settings(WHITENOISE_USE_FINDERS=True, WHITENOISE_AUTOREFRESH=True)
+    async def test_static_files_are_served(self):
+        response = await self.async_client.get('/static/admin/css/base.css')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    async def test_register_login_and_read_back(self):
+        response = await self.register(self.user_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user_id = response.json()['data']['user']['userId']
+
+        response = await self.async_client.post(reverse('login'),
+                                                data=json.dumps({
+                                                    "email": self.user_data['email'],
+                                                    "password": self.user_data['password']
+                                                }),
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        headers = {"AUTHORIZATION": f"Bearer {response.json()['data']['accessToken']}"}
+
+        response = await self.async_client.get(reverse('users', args=[user_id]), headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data']['email'], self.user_data['email'])
+
+        response = await self.async_client.get(reverse('organisations'), headers=headers)
+        organisations = response.json()['data']['organisations']
+        self.assertEqual([org['name'] for org in organisations], ["John's Organisaton"])
+
+        response = await self.async_client.get(
+            reverse('org_details', args=[organisations[0]['orgId']]), headers=headers)
+        self.assertEqual(response.json()['data']['name'], "John's Organisaton")
+
+    async def test_register_duplicate_email(self):
+        await self.register(self.user_data)
+        response = await self.register({**self.user_data, "firstName": "James"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('user with this email already exists.', response.json()['errors']['email'])
+
+    async def test_add_user_with_malformed_id_is_a_client_error(self):
+        response = await self.register(self.user_data)
+        headers = {"AUTHORIZATION": f"Bearer {response.json()['data']['accessToken']}"}
+        response = await self.async_client.get(reverse('organisations'), headers=headers)
+        org_id = response.json()['data']['organisations'][0]['orgId']
+        response = await self.async_client.post(reverse('add_user', args=[org_id]),
+                                                data=json.dumps({"userId": "not-a-uuid"}),
+                                                content_type='application/json', headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_create_organisation_and_add_user(self):
+        response = await self.register(self.user_data)
+        headers = {"AUTHORIZATION": f"Bearer {response.json()['data']['accessToken']}"}
+        response = await self.register({**self.user_data, "firstName": "Jane", "email": "jane@example.com"})
+        jane_id = response.json()['data']['user']['userId']
+
+        response = await self.async_client.post(reverse('organisations'),
+                                                data=json.dumps({"name": "Acme"}),
+                                                content_type='application/json',
+                                                headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        org_id = response.json()['orgId']
+
+        response = await self.async_client.post(reverse('add_user', args=[org_id]),
+                                                data=json.dumps({"userId": jane_id}),
+                                                content_type='application/json',
+                                                headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(await Organisation.objects.filter(orgId=org_id, users__userId=jane_id).aexists())
+
+    async def test_protected_views_require_a_token(self):
+        response = await self.async_client.get(reverse('organisations'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_login_failure(self):
+        await self.register(self.user_data)
+        response = await self.async_client.post(reverse('login'),
+                                                data=json.dumps({
+                                                    "email": self.user_data['email'],
+                                                    "password": "wrong-password"
+                                                }),
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()['message'], 'Authentication failed')
+
+
+class BulkAddMembersTests(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        response = self.client.post(reverse('register'),
+                                    data=json.dumps({
+                                        "firstName": "John",
+                                        "lastName": "Doe",
+                                        "email": "john@example.com",
+                                        "password": "password123",
+                                        "phone": "08012345678"
+                                    }),
+                                    content_type='application/json')
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {response.data['data']['accessToken']}"}
+        self.owner = User.objects.get(email="john@example.com")
+        self.org = Organisation.objects.get(owner=self.owner)
+        self.users = User.objects.bulk_create([
+            User(email=f"user{i}@example.com", firstName="User", lastName=str(i))
+            for i in range(50)
+        ])
+
+    def test_add_members_uses_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(2):
+            results = self.org.add_members([str(user.userId) for user in self.users])
+
+        self.assertEqual(set(results.values()), {'added'})
+        self.assertEqual(self.org.users.count(), 51)
+
+    def test_reports_outcome_per_id(self):
+        missing = '00000000-0000-0000-0000-000000000000'
+        user_ids = [str(self.users[0].userId), str(self.owner.userId), missing, 'not-a-uuid']
+        response = self.client.post(reverse('add_user', args=[self.org.orgId]),
+                                    data=json.dumps({"userIds": user_ids}),
+                                    content_type='application/json',
+                                    **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['results'], {
+            user_ids[0]: 'added',
+            user_ids[1]: 'already_member',
+            missing: 'unknown',
+            'not-a-uuid': 'unknown',
+        })
+        self.assertTrue(self.org.users.filter(pk=self.users[0].pk).exists())
+
+    def test_single_user_id_still_supported(self):
+        response = self.client.post(reverse('add_user', args=[self.org.orgId]),
+                                    data=json.dumps({"userId": str(self.users[0].userId)}),
+                                    content_type='application/json',
+                                    **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['message'], "User added to organisation successfully")
+        self.assertTrue(self.org.users.filter(pk=self.users[0].pk).exists())
+
+    def test_malformed_single_user_id_is_a_client_error(self):
+        response = self.client.post(reverse('add_user', args=[self.org.orgId]),
+                                    data=json.dumps({"userId": "not-a-uuid"}),
+                                    content_type='application/json',
+                                    **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_empty_list_is_rejected(self):
+        response = self.client.post(reverse('add_user', args=[self.org.orgId]),
+                                    data=json.dumps({"userIds": []}),
+                                    content_type='application/json',
+                                    **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_the_owner_can_add_members(self):
+        stranger = User.objects.create(email="jane@example.com", firstName="Jane", lastName="Doe")
+        org = Organisation.objects.create_organisation(name="Jane's Organisation", owner=stranger)
+        user_id = str(self.users[0].userId)
+        for body in [{"userIds": [user_id]}, {"userId": user_id}]:
+            with self.subTest(body=body):
+                response = self.client.post(reverse('add_user', args=[org.orgId]),
+                                            data=json.dumps(body),
+                                            content_type='application/json',
+                                            **self.headers)
+
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+                self.assertFalse(org.users.filter(pk=self.users[0].pk).exists())
+
+    @override_settings(ROOT_URLCONF='hngUser.asgi_urls')
+    async def test_only_the_owner_can_add_members_async(self):
+        stranger = await User.objects.acreate(email="jane@example.com", firstName="Jane", lastName="Doe")
+        org = await Organisation.objects.acreate_organisation(name="Jane's Organisation", owner=stranger)
+        user_id = str(self.users[0].userId)
+        for body in [{"userIds": [user_id]}, {"userId": user_id}]:
+            with self.subTest(body=body):
+                response = await self.async_client.post(
+                    reverse('add_user', args=[org.orgId]), data=json.dumps(body),
+                    content_type='application/json',
+                    headers={"AUTHORIZATION": self.headers["HTTP_AUTHORIZATION"]})
+
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+                self.assertFalse(await org.users.filter(pk=self.users[0].pk).aexists())
+
+
+class BatchLookupTests(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        response = self.client.post(reverse('register'),
+                                    data=json.dumps({
+                                        "firstName": "John",
+                                        "lastName": "Doe",
+                                        "email": "john@example.com",
+                                        "password": "password123",
+                                        "phone": "08012345678"
+                                    }),
+                                    content_type='application/json')
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {response.data['data']['accessToken']}"}
+        self.owner = User.objects.get(email="john@example.com")
+        self.users = User.objects.bulk_create([
+            User(email=f"user{i}@example.com", firstName="User", lastName=str(i))
+            for i in range(20)
+        ])
+        self.missing = '00000000-0000-0000-0000-000000000000'
+        # Warm the user cache so only the lookup itself is counted.
+        self.client.get(reverse('users_list') + f'?ids={self.missing}', **self.headers)
+
+    def test_users_are_fetched_with_one_query(self):
+        ids = [str(user.userId) for user in self.users] + [self.missing]
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('users_list') + '?ids=' + ','.join(ids), **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        users = response.data['data']['users']
+        self.assertEqual(len(users), 21)
+        self.assertEqual(users[ids[0]]['email'], "user0@example.com")
+        self.assertIsNone(users[self.missing])
+        self.assertEqual(response.data['data']['notFound'], [self.missing])
+
+    def test_users_batch_accepts_a_post_body(self):
+        response = self.client.post(reverse('users_batch'),
+                                    data=json.dumps({"ids": [str(self.users[0].userId), "bogus"]}),
+                                    content_type='application/json',
+                                    **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['notFound'], ["bogus"])
+
+    def test_organisations_are_scoped_to_the_caller(self):
+        mine = Organisation.objects.get(owner=self.owner)
+        theirs = Organisation.objects.create_organisation(owner=self.users[0], name="Other")
+        ids = [str(mine.orgId), str(theirs.orgId)]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('organisations') + '?ids=' + ','.join(ids), **self.headers)
+        organisations = response.data['data']['organisations']
+        self.assertEqual(organisations[ids[0]]['name'], mine.name)
+        self.assertIsNone(organisations[ids[1]])
+
+        response = self.client.post(reverse('organisations_batch'),
+                                    data=json.dumps({"ids": ids}),
+                                    content_type='application/json',
+                                    **self.headers)
+        self.assertEqual(response.data['data']['notFound'], [ids[1]])
+
+    def test_missing_ids_are_rejected(self):
+        response = self.client.get(reverse('users_list'), **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(ORG_LIST_CACHE={**settings.ORG_LIST_CACHE, "ENABLED": True})
+class OrganisationListCacheTests(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.cache = get_organisation_list_cache()
+        response = self.client.post(reverse('register'),
+                                    data=json.dumps({
+                                        "firstName": "John",
+                                        "lastName": "Doe",
+                                        "email": "john@example.com",
+                                        "password": "password123",
+                                        "phone": "08012345678"
+                                    }),
+                                    content_type='application/json')
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {response.data['data']['accessToken']}"}
+        self.user = User.objects.get(email="john@example.com")
+
+    def org_names(self):
+        response = self.client.get(reverse('organisations'), **self.headers)
+        return [org['name'] for org in response.data['data']['organisations']]
+
+    def test_repeat_requests_are_served_from_cache(self):
+        self.org_names()
+        hits = self.cache.hits
+
+        with CaptureQueriesContext(connection) as ctx:
+            names = self.org_names()
+
+        self.assertEqual(names, ["John's Organisaton"])
+        self.assertEqual(self.cache.hits, hits + 1)
+        self.assertFalse([q for q in ctx.captured_queries if 'api_organisation' in q['sql']])
+
+    def test_creating_an_organisation_bumps_the_generation(self):
+        self.org_names()
+        response = self.client.post(reverse('organisations'),
+                                    data=json.dumps({"name": "Acme"}),
+                                    content_type='application/json',
+                                    **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.org_names(), ["John's Organisaton", "Acme"])
+
+    def test_adding_a_member_bumps_their_generation(self):
+        other = Organisation.objects.create_organisation(
+            owner=User.objects.create(email="jane@example.com", firstName="Jane", lastName="Doe"),
+            name="Jane's Organisation")
+        self.org_names()
+
+        other.add_members([str(self.user.userId)])
+
+        self.assertEqual(self.org_names(), ["John's Organisaton", "Jane's Organisation"])
+
+    def test_renaming_an_organisation_bumps_every_member(self):
+        jane = User.objects.create(email="jane@example.com", firstName="Jane", lastName="Doe")
+        org = Organisation.objects.create_organisation(owner=jane, name="Jane's Organisation")
+        org.add_members([str(self.user.userId)])
+        self.org_names()
+
+        org.name = "Acme"
+        org.save()
+
+        self.assertEqual(self.org_names(), ["John's Organisaton", "Acme"])
+
+    @override_settings(ROOT_URLCONF='hngUser.asgi_urls')
+    async def test_async_list_shares_the_cache(self):
+        headers = {"AUTHORIZATION": self.headers["HTTP_AUTHORIZATION"]}
+        await self.async_client.get(reverse('organisations'), headers=headers)
+        hits = self.cache.hits
+
+        response = await self.async_client.get(reverse('organisations'), headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([org['name'] for org in response.json()['data']['organisations']],
+                         ["John's Organisaton"])
+        self.assertEqual(self.cache.hits, hits + 1)
+
+        response = await self.async_client.get(reverse('organisations'), {'cursor': 'bogus'}, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_django_cache_backend(self):
+        cache = OrganisationListCache(DjangoCacheBackend('default', ttl=60))
+        generation, value = cache.lookup('user', 'page')
+        self.assertIsNone(value)
+        cache.store('user', generation, 'page', {"organisations": []})
+        self.assertEqual(cache.lookup('user', 'page'), (generation, {"organisations": []}))
+
+        cache.bump('user')
+        self.assertIsNone(cache.lookup('user', 'page')[1])
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        response = self.client.post(reverse('register'),
+                                    data=json.dumps({
+                                        "firstName": "John",
+                                        "lastName": "Doe",
+                                        "email": "john@example.com",
+                                        "password": "password123",
+                                        "phone": "08012345678"
+                                    }),
+                                    content_type='application/json')
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {response.data['data']['accessToken']}"}
+        self.user = User.objects.get(email="john@example.com")
+        self.org = Organisation.objects.get(owner=self.user)
+
+    def test_unchanged_user_is_not_modified(self):
+        url = reverse('users', args=[self.user.userId])
+        response = self.client.get(url, **self.headers)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changed_user_gets_a_new_etag(self):
+        url = reverse('users', args=[self.user.userId])
+        etag = self.client.get(url, **self.headers)['ETag']
+        User.objects.filter(pk=self.user.pk).update(phone="0000")
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['data']['phone'], "0000")
+
+    def test_unchanged_organisation_is_not_modified(self):
+        url = reverse('org_details', args=[self.org.orgId])
+        response = self.client.get(url, **self.headers)
+        self.assertEqual(response.data['data']['orgId'], str(self.org.orgId))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(ROOT_URLCONF='hngUser.asgi_urls')
+    async def test_async_views_honour_if_none_match(self):
+        headers = {"AUTHORIZATION": self.headers["HTTP_AUTHORIZATION"]}
+        url = reverse('users', args=[self.user.userId])
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = await self.async_client.get(
+            url, headers={**headers, "If-None-Match": response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@override_settings(SQL_INSTRUMENTATION_SAMPLE_RATE=1.0)
+class QueryInstrumentationTests(TestCase):
+
+    def test_reports_queries_in_server_timing_and_logs(self):
+        client = Client()
+        with self.assertLogs('hngUser.sql', level='INFO') as logs:
+            response = client.post(reverse('register'),
+                                   data=json.dumps({
+                                       "firstName": "John",
+                                       "lastName": "Doe",
+                                       "email": "john@example.com",
+                                       "password": "password123",
+                                       "phone": "08012345678"
+                                   }),
+                                   content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['path'], reverse('register'))
+        self.assertGreaterEqual(record['queries'], 3)
+        self.assertTrue(record['slowestSql'])
+
+    def test_counts_queries_run_while_streaming(self):
+        admin = User.objects.create(email="admin@example.com", firstName="Ad", lastName="Min",
+                                    is_superuser=True)
+        Organisation.objects.create_organisation(name="Acme", owner=admin)
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(admin).access_token}"}
+        client = Client()
+        with self.assertLogs('hngUser.sql', level='INFO'):
+            client.get(reverse('organisations'), **headers)  # caches the user
+
+        with self.assertNoLogs('hngUser.sql', level='INFO'):
+            response = client.get(reverse('export_organisations'), **headers)
+        with self.assertLogs('hngUser.sql', level='INFO') as logs:
+            body = b''.join(response.streaming_content)
+
+        self.assertIn(b'Acme', body)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['path'], reverse('export_organisations'))
+        self.assertGreaterEqual(record['queries'], 1)
+        self.assertIn('api_organisation', record['slowestSql'])
+
+    @override_settings(ROOT_URLCONF='hngUser.asgi_urls')
+    async def test_counts_queries_of_async_views(self):
+        with self.assertLogs('hngUser.sql', level='INFO') as logs:
+            response = await self.async_client.post(reverse('register'),
+                                                    data=json.dumps({
+                                                        "firstName": "John",
+                                                        "lastName": "Doe",
+                                                        "email": "john@example.com",
+                                                        "password": "password123",
+                                                        "phone": "08012345678"
+                                                    }),
+                                                    content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertGreaterEqual(record['queries'], 3)
+
+    @override_settings(DEBUG=True, MIDDLEWARE=['hngUser.middleware.QueryInstrumentationMiddleware'])
+    def test_runs_natively_under_asgi(self):
+        # Django logs each middleware it has to adapt between sync and async.
+        with self.assertNoLogs('django.request', level='DEBUG'):
+            ASGIHandler()
+
+    @override_settings(SQL_INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_disabled_when_sample_rate_is_zero(self):
+        response = Client().get(reverse('organisations'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        self.profiling = override_settings(PROFILING={
+            "ENABLED": True,
+            "OUTPUT_DIR": self.output_dir,
+            "MAX_AGE": 300,
+            "SAMPLE_INTERVAL": 0.001,
+        })
+        self.profiling.enable()
+        self.addCleanup(self.profiling.disable)
+
+    def test_signed_header_writes_profile(self):
+        response = Client().get(reverse('organisations'), HTTP_X_PROFILE=make_profile_token())
+
+        profile_id = response['X-Profile-Id']
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, f'{profile_id}.pstats')))
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, f'{profile_id}.collapsed')))
+
+    def test_bad_token_is_not_profiled(self):
+        response = Client().get(reverse('organisations'), HTTP_X_PROFILE='profile:forged')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_superuser_token_can_request_a_profile(self):
+        admin = User.objects.create(email="admin@example.com", firstName="Ad", lastName="Min",
+                                    is_superuser=True)
+        member = User.objects.create(email="member@example.com", firstName="Mem", lastName="Ber")
+        for user, profiled in [(admin, True), (member, False)]:
+            token = RefreshToken.for_user(user).access_token
+            response = Client().get(reverse('organisations'), HTTP_X_PROFILE='1',
+                                    HTTP_AUTHORIZATION=f'Bearer {token}')
+            self.assertEqual('X-Profile-Id' in response, profiled)
+
+    def test_regular_user_asking_for_a_profile_is_served_unprofiled(self):
+        # The User model has no is_staff, so checking it failed every such request.
+        member = User.objects.create(email="member@example.com", firstName="Mem", lastName="Ber")
+        token = RefreshToken.for_user(member).access_token
+        response = Client().get(reverse('organisations'), HTTP_X_PROFILE='1',
+                                HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Id', response)
+
+        client = Client()
+        client.force_login(member)
+        response = client.get(reverse('organisations'), HTTP_X_PROFILE='1',
+                              HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    @override_settings(ROOT_URLCONF='hngUser.asgi_urls')
+    async def test_async_request_writes_profile(self):
+        response = await self.async_client.get(reverse('ready'),
+                                               headers={"X-Profile": make_profile_token()})
+
+        profile_id = response['X-Profile-Id']
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, f'{profile_id}.pstats')))
+
+    @override_settings(DEBUG=True, MIDDLEWARE=['hngUser.middleware.ProfilingMiddleware'])
+    def test_runs_natively_under_asgi(self):
+        with self.assertNoLogs('django.request', level='DEBUG'):
+            ASGIHandler()
+
+    def test_requests_without_header_are_not_profiled(self):
+        response = Client().get(reverse('organisations'))
+        self.assertNotIn('X-Profile-Id', response)
+
+
+# Boots hngUser.settings_api for real through the entry point named on the
+# command line, in a fresh interpreter: INSTALLED_APPS can't be swapped
+# inside the test process. Prints the status of each request as JSON.
+SETTINGS_API_PROBE = """
+import asyncio, importlib, io, json, sys
+from wsgiref.util import setup_testing_defaults
+
+application = importlib.import_module(f'hngUser.{sys.argv[1]}').application
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+call_command('migrate', verbosity=0)
+
+def wsgi(method, path, body=b''):
+    environ = {'REQUEST_METHOD': method, 'PATH_INFO': path, 'CONTENT_TYPE': 'application/json',
+               'CONTENT_LENGTH': str(len(body)), 'wsgi.input': io.BytesIO(body)}
+    setup_testing_defaults(environ)
+    statuses = []
+    b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+    return int(statuses[0].split()[0])
+
+async def serve_asgi(method, path, body):
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+             'headers': [(b'host', b'127.0.0.1'), (b'content-type', b'application/json')]}
+    messages = [{'type': 'http.request', 'body': body}]
+    sent = []
+
+    async def receive():
+        return messages.pop() if messages else await asyncio.Future()
+
+    async def send(message):
+        sent.append(message)
+
+    await application(scope, receive, send)
+    return sent[0]['status']
+
+def asgi(method, path, body=b''):
+    return asyncio.run(serve_asgi(method, path, body))
+
+request = wsgi if sys.argv[1] == 'wsgi' else asgi
+user = json.dumps({'firstName': 'John', 'lastName': 'Doe', 'email': 'john@example.com',
+                   'password': 'password123', 'phone': '08012345678'}).encode()
+login = json.dumps({'email': 'john@example.com', 'password': 'password123'}).encode()
+print(json.dumps([
+    request('GET', '/ready'),
+    request('POST', '/auth/register', user),
+    request('POST', '/auth/login', login),
+    request('GET', '/api/organisations'),
+]))
+"""
+
+
+class APISettingsBootTests(SimpleTestCase):
+
+    def run_script(self, script, *args):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'hngUser.settings_api',
+            'POSTGRES_URL': f'sqlite:///{os.path.join(directory, "db.sqlite3")}',
+            'REPLICA_URLS': '',
+            'PASSWORD_HASHING_WORKERS': '0',
+            'WARMUP_ON_BOOT': 'False',
+        }
+        result = subprocess.run([sys.executable, '-c', script, *args], env=env,
+                                cwd=settings.BASE_DIR, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+    def boot(self, entry_point):
+        return self.run_script(SETTINGS_API_PROBE, entry_point)
+
+    def test_serves_over_wsgi(self):
+        statuses, stderr = self.boot('wsgi')
+        self.assertEqual(statuses, [200, 201, 200, 401], stderr)
+
+    def test_serves_over_asgi(self):
+        statuses, stderr = self.boot('asgi')
+        self.assertEqual(statuses, [200, 201, 200, 401], stderr)
+
+    def test_does_not_import_sessions_or_messages(self):
+        modules, stderr = self.run_script(
+            "import json, sys, hngUser.asgi, hngUser.wsgi\n"
+            "print(json.dumps([name for name in sys.modules if name.startswith("
+            "('django.contrib.sessions', 'django.contrib.messages'))]))")
+        self.assertEqual(modules, [], stderr)
+
+
+@override_settings(ROOT_URLCONF='hngUser.urls_api', MIDDLEWARE=[
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+])
+class APISettingsProfileTests(TestCase):
+
+    def test_register_and_login_without_sessions(self):
+        client = Client()
+        response = client.post(reverse('register'),
+                               data=json.dumps({
+                                   "firstName": "John",
+                                   "lastName": "Doe",
+                                   "email": "john@example.com",
+                                   "password": "password123",
+                                   "phone": "08012345678"
+                               }),
+                               content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = client.post(reverse('login'),
+                               data=json.dumps({"email": "john@example.com", "password": "password123"}),
+                               content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        token = response.json()['data']['accessToken']
+
+        response = client.get(reverse('organisations'), HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('sessionid', response.cookies)
+
+
+@override_settings(TOKEN_ONLY_AUTH=True)
+class TokenOnlyAuthTests(TestCase):
+
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.post(reverse('register'),
+                         data=json.dumps({
+                             "firstName": "John",
+                             "lastName": "Doe",
+                             "email": "john@example.com",
+                             "password": "password123",
+                             "phone": "08012345678"
+                         }),
+                         content_type='application/json')
+
+    def login(self):
+        return self.client.post(reverse('login'),
+                                data=json.dumps({"email": "john@example.com", "password": "password123"}),
+                                content_type='application/json')
+
+    def test_login_issues_a_token_without_a_session(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('accessToken', response.json()['data'])
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertNotIn('csrftoken', response.cookies)
+        self.assertFalse(Session.objects.exists())
+        self.assertFalse(any('django_session' in query['sql'] for query in ctx.captured_queries))
+
+    def test_login_still_records_last_login(self):
+        self.login()
+        self.assertIsNotNone(User.objects.get(email='john@example.com').last_login)
+
+    def test_api_requests_skip_the_session_middleware(self):
+        token = self.login().json()['data']['accessToken']
+        with mock.patch.object(SessionMiddleware, 'process_request', autospec=True,
+                               side_effect=SessionMiddleware.process_request) as process:
+            response = self.client.get(reverse('organisations'), HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        process.assert_not_called()
+
+    def test_other_paths_keep_their_session(self):
+        with mock.patch.object(SessionMiddleware, 'process_request', autospec=True,
+                               side_effect=SessionMiddleware.process_request) as process:
+            self.client.get('/')
+        process.assert_called_once()
+
+
+class LastLoginBufferTests(TestCase):
+
+    def setUp(self):
+        self.users = [
+            User.objects.create(email=f'user{i}@example.com', firstName='User', lastName=str(i),
+                                password=make_password('password123'))
+            for i in range(3)
+        ]
+
+    def login(self, email='user0@example.com'):
+        return Client().post(reverse('login'),
+                             data=json.dumps({"email": email, "password": "password123"}),
+                             content_type='application/json')
+
+    def test_flush_writes_the_newest_timestamps_in_one_update(self):
+        buffer = LastLoginBuffer(max_lag=60, max_pending=100)
+        earlier, later = timezone.now() - timedelta(minutes=5), timezone.now()
+        for user in self.users:
+            buffer.record(user.pk, later)
+        buffer.record(self.users[0].pk, earlier)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(buffer.flush(), 3)
+        updates = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(set(User.objects.values_list('last_login', flat=True)), {later})
+        self.assertEqual(len(buffer), 0)
+
+    def test_record_flushes_once_due(self):
+        buffer = LastLoginBuffer(max_lag=60, max_pending=2)
+        self.assertFalse(buffer.is_due())
+        buffer.record(self.users[0].pk, timezone.now())
+        self.assertEqual(len(buffer), 1)
+        buffer.record(self.users[1].pk, timezone.now())
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(User.objects.filter(last_login__isnull=False).count(), 2)
+
+        buffer = LastLoginBuffer(max_lag=60, max_pending=100)
+        buffer.record(self.users[2].pk, timezone.now())
+        with mock.patch('api.last_login.time.monotonic', return_value=time.monotonic() + 60):
+            self.assertTrue(buffer.is_due())
+            buffer.record(self.users[0].pk, timezone.now())
+        self.assertEqual(len(buffer), 0)
+        self.assertIsNotNone(User.objects.get(pk=self.users[2].pk).last_login)
+
+    def test_failed_flush_keeps_the_timestamps(self):
+        buffer = LastLoginBuffer(max_lag=0, max_pending=100)
+        with mock.patch('api.last_login.write_last_logins', side_effect=OperationalError), \
+                self.assertLogs('hngUser.last_login', 'ERROR'):
+            buffer.record(self.users[0].pk, timezone.now())
+        self.assertEqual(len(buffer), 1)
+        self.assertEqual(buffer.flush(), 1)
+
+    def test_request_end_flush_runs_before_connections_close(self):
+        keys = [key for (key, _), _, _ in request_finished.receivers]
+        self.assertLess(keys.index('flush_last_logins'), keys.index(id(close_old_connections)))
+
+    @override_settings(LAST_LOGIN_BUFFER={"ENABLED": True, "MAX_LAG": 3600, "MAX_PENDING": 1000})
+    def test_login_queues_last_login_instead_of_updating(self):
+        buffer = LastLoginBuffer(max_lag=3600, max_pending=1000)
+        with mock.patch('api.last_login._buffer', buffer):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.login()
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(any(query['sql'].startswith(f'UPDATE "{User._meta.db_table}"')
+                                 for query in ctx.captured_queries))
+            self.assertIsNone(User.objects.get(email='user0@example.com').last_login)
+            self.assertEqual(len(buffer), 1)
+
+            buffer.flush()
+        self.assertIsNotNone(User.objects.get(email='user0@example.com').last_login)
+
+    @override_settings(LAST_LOGIN_BUFFER={"ENABLED": True, "MAX_LAG": 0, "MAX_PENDING": 1000})
+    def test_request_end_flushes_once_due(self):
+        buffer = LastLoginBuffer(max_lag=0, max_pending=1000)
+        with mock.patch('api.last_login._buffer', buffer):
+            self.login()
+        self.assertIsNotNone(User.objects.get(email='user0@example.com').last_login)
+        self.assertEqual(len(buffer), 0)
+
+    def test_disabled_buffer_updates_on_login(self):
+        self.login()
+        self.assertIsNotNone(User.objects.get(email='user0@example.com').last_login)
+
+    @skipUnless(connection.vendor == 'postgresql', 'UPDATE ... FROM (VALUES ...) is PostgreSQL only')
+    def test_postgres_values_update(self):
+        when = timezone.now()
+        with CaptureQueriesContext(connection) as ctx:
+            write_last_logins([(user.pk, when) for user in self.users])
+        self.assertIn('FROM (VALUES', ctx.captured_queries[-1]['sql'])
+        self.assertEqual(set(User.objects.values_list('last_login', flat=True)), {when})
+
+
+class ReadinessTests(TestCase):
+    # warm_up() opens every configured connection, replicas included.
+    databases = '__all__'
+
+    def test_ready_when_database_answers(self):
+        response = Client().get(reverse('ready'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['message'], 'Ready')
+
+    def test_not_ready_when_database_fails(self):
+        with mock.patch.object(connection, 'cursor', side_effect=OperationalError('down')):
+            response = Client().get(reverse('ready'))
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.json()['statusCode'], 503)
+
+    def test_warm_up_runs_every_step(self):
+        with self.assertLogs('hngUser.warmup', 'INFO') as logs:
+            timings = warm_up()
+        self.assertEqual(set(timings), {'connection', 'routes', 'serializers'})
+        self.assertIn('warm-up finished', logs.output[-1])
+
+    def test_warm_up_without_connection(self):
+        with mock.patch('hngUser.warmup.connections') as patched:
+            timings = warm_up('hngUser.asgi_urls', connection=False)
+        patched.all.assert_not_called()
+        self.assertEqual(set(timings), {'routes', 'serializers'})
+
+
+class PrimaryReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter(replicas=['replica0'])
+
+    def test_reads_go_to_a_replica(self):
+        with routing(Routing()):
+            self.assertEqual(self.router.db_for_read(User), 'replica0')
+
+    def test_a_write_pins_the_rest_of_the_request_to_the_primary(self):
+        with routing(Routing()) as state:
+            self.assertEqual(self.router.db_for_write(User), 'default')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertTrue(state.wrote)
+
+    def test_pinned_requests_read_from_the_primary(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_writes_outside_a_request_leave_no_state_behind(self):
+        def write_then_read():
+            self.assertEqual(self.router.db_for_write(User), 'default')
+            return _routing.get()
+
+        # A bare context, as in a thread outside any request or command.
+        self.assertIsNone(contextvars.Context().run(write_then_read))
+
+    def test_sticky_check_is_asked_until_it_can_tell(self):
+        answers = iter([None, True])
+        with routing(Routing(sticky=lambda: next(answers))) as state:
+            self.assertEqual(self.router.db_for_read(User), 'replica0')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertIsNone(state.sticky)
+
+    def test_without_replicas_everything_uses_default(self):
+        router = PrimaryReplicaRouter(replicas=[])
+        with routing(Routing()):
+            self.assertEqual(router.db_for_read(User), 'default')
+
+    def test_only_the_primary_is_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'api'))
+        self.assertFalse(self.router.allow_migrate('replica0', 'api'))
+
+
+@mock.patch('hngUser.middleware.replica_aliases', return_value=['replica0'])
+class ReplicaRoutingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='john@example.com', firstName='John', lastName='Doe',
+                                        password=make_password('password123'))
+        self.token = RefreshToken.for_user(self.user).access_token
+
+    def pinned_reads(self, client, method, path, **extra):
+        # Which way each read of the request was routed, and the response.
+        seen = []
+
+        def record(router, model, **hints):
+            seen.append(_routing.get().read_primary())
+            return 'default'
+
+        with mock.patch.object(PrimaryReplicaRouter, 'db_for_read', autospec=True, side_effect=record):
+            response = getattr(client, method)(path, HTTP_AUTHORIZATION=f'Bearer {self.token}', **extra)
+        return seen, response
+
+    def test_safe_requests_may_read_from_replicas(self, replica_aliases):
+        seen, response = self.pinned_reads(Client(), 'get', reverse('organisations'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(seen)
+        self.assertFalse(any(seen))
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_writes_stick_the_client_to_the_primary(self, replica_aliases):
+        client = Client()
+        seen, response = self.pinned_reads(
+            client, 'post', reverse('organisations'),
+            data=json.dumps({'name': 'Reads', 'description': ''}), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(all(seen))
+        cookie = response.cookies[STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+        seen, response = self.pinned_reads(client, 'get', reverse('organisations'))
+        self.assertTrue(seen)
+        self.assertTrue(all(seen))
+
+    def test_writes_pin_the_user_for_token_clients(self, replica_aliases):
+        seen, response = self.pinned_reads(
+            Client(), 'post', reverse('organisations'),
+            data=json.dumps({'name': 'Tokens', 'description': ''}), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # A fresh client without the cookie, as an API client would be.
+        seen, response = self.pinned_reads(Client(), 'get', reverse('organisations'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(seen[-1])
+
+        other = User.objects.create(email='jane@example.com', firstName='Jane', lastName='Doe')
+        self.token = RefreshToken.for_user(other).access_token
+        seen, response = self.pinned_reads(Client(), 'get', reverse('organisations'))
+        self.assertFalse(any(seen))
+
+    @override_settings(ROOT_URLCONF='hngUser.asgi_urls')
+    async def test_async_writes_stick_the_client_to_the_primary(self, replica_aliases):
+        response = await self.async_client.post(
+            reverse('organisations'), data=json.dumps({'name': 'Async', 'description': ''}),
+            content_type='application/json', headers={"AUTHORIZATION": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        pin = f'{ReplicaRoutingMiddleware.pin_prefix}{self.user.pk}'
+        self.assertTrue(await caches[settings.REPLICA_STICKY_CACHE].aget(pin))
+
+    @override_settings(DEBUG=True, MIDDLEWARE=['hngUser.middleware.ReplicaRoutingMiddleware'])
+    def test_runs_natively_under_asgi(self, replica_aliases):
+        with self.assertNoLogs('django.request', level='DEBUG'):
+            ASGIHandler()
+
+
+@skipUnless(replica_aliases(), 'set REPLICA_URLS to route reads to a replica')
+class ReplicaReadTests(TransactionTestCase):
+    # TestCase keeps every test in a transaction on the primary, which the
+    # router (rightly) never sends to a replica; commit for real instead.
+    databases = '__all__'
+
+    def test_reads_reach_the_replica_unless_the_client_just_wrote(self):
+        client = Client()
+        response = client.post(reverse('register'),
+                               data=json.dumps({
+                                   "firstName": "John",
+                                   "lastName": "Doe",
+                                   "email": "john@example.com",
+                                   "password": "password123",
+                                   "phone": "08012345678"
+                               }),
+                               content_type='application/json')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        data = response.json()['data']
+        path, token = reverse('users', args=[data['user']['userId']]), data['accessToken']
+        replica = connections[replica_aliases()[0]]
+
+        with CaptureQueriesContext(replica) as ctx:
+            client.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        with CaptureQueriesContext(replica) as ctx:
+            response = Client().get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(len(ctx.captured_queries), 0)
+
+
+class FakeConnection:
+    # Stands in for a psycopg connection; enough for the pool and backend.
+    class Info:
+        server_version = 160000
+        transaction_status = 0
+
+        def parameter_status(self, name):
+            return 'UTC'
+
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.info = self.Info()
+
+    def cursor(self, *args, **kwargs):
+        return mock.MagicMock()
+
+    def rollback(self):
+        self.info.transaction_status = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.handshakes = []
+        self.now = 0.0
+
+    def connect(self):
+        connection = FakeConnection()
+        self.handshakes.append(connection)
+        return connection
+
+    def pool(self, **kwargs):
+        return ConnectionPool(self.connect, clock=lambda: self.now, **kwargs)
+
+    def test_connections_are_opened_lazily(self):
+        pool = self.pool(min_size=2, max_size=4)
+        self.assertEqual(pool.stats()['size'], 0)
+        pool.putconn(pool.getconn())
+        self.assertEqual(len(self.handshakes), 1)
+
+    def test_a_thousand_requests_reuse_a_handful_of_connections(self):
+        pool = ConnectionPool(self.connect, max_size=4)
+
+        def serve(requests):
+            for _ in range(requests):
+                pool.putconn(pool.getconn())
+
+        threads = [threading.Thread(target=serve, args=(125,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = pool.stats()
+        self.assertEqual(stats['checkouts'], 1000)
+        self.assertLessEqual(stats['connects'], 4)
+        self.assertEqual(stats['connects'], len(self.handshakes))
+        self.assertEqual(stats['in_use'], 0)
+
+    def test_checkouts_wait_then_time_out_when_exhausted(self):
+        pool = ConnectionPool(self.connect, max_size=1, timeout=0.01)
+        held = pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        pool.putconn(held)
+        self.assertIs(pool.getconn(), held)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_idle_connections_are_reaped_down_to_min_size(self):
+        pool = self.pool(min_size=1, max_size=3, max_idle=60)
+        checked_out = [pool.getconn() for _ in range(3)]
+        for conn in checked_out:
+            pool.putconn(conn)
+
+        self.now = 61
+        kept = pool.getconn()
+        self.assertIs(kept, checked_out[2])
+        self.assertTrue(checked_out[0].closed and checked_out[1].closed)
+        self.assertEqual(pool.stats()['reaped'], 2)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_stale_connections_are_checked_before_reuse(self):
+        pool = self.pool(check=lambda connection: False, check_after=30)
+        first = pool.getconn()
+        pool.putconn(first)
+        self.now = 10
+        self.assertIs(pool.getconn(), first)
+        pool.putconn(first)
+
+        self.now = 100
+        replacement = pool.getconn()
+        self.assertIsNot(replacement, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_discarded_connections_free_their_slot(self):
+        pool = self.pool(max_size=1, timeout=0)
+        pool.putconn(pool.getconn(), discard=True)
+        pool.getconn()
+        self.assertEqual(len(self.handshakes), 2)
+
+
+class PooledBackendTests(SimpleTestCase):
+
+    def wrapper(self, backend):
+        settings_dict = {
+            'ENGINE': backend.__name__, 'NAME': 'hng', 'USER': 'hng', 'PASSWORD': '', 'HOST': 'localhost',
+            'PORT': '5432', 'OPTIONS': {}, 'TIME_ZONE': None, 'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': False, 'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False, 'TEST': {},
+        }
+        return backend.DatabaseWrapper(settings_dict, alias='pooled')
+
+    @contextmanager
+    def fake_connect(self):
+        with mock.patch('psycopg2.connect', side_effect=lambda **params: FakeConnection()) as connect, \
+                mock.patch('psycopg2.extras.register_default_jsonb'):
+            yield connect
+
+    def handshakes(self, backend, requests):
+        # Opens and closes the connection once per request, as CONN_MAX_AGE=0 does.
+        with self.fake_connect() as connect:
+            wrapper = self.wrapper(backend)
+            for _ in range(requests):
+                wrapper.ensure_connection()
+                wrapper.close()
+        return connect.call_count
+
+    def tearDown(self):
+        close_pools('pooled')
+
+    def test_pooling_pays_one_handshake_per_thousand_requests(self):
+        self.assertEqual(self.handshakes(postgresql_backend, 1000), 1000)
+        self.assertEqual(self.handshakes(pooled_backend, 1000), 1)
+        self.assertEqual(pool_stats()['pooled']['checkouts'], 1000)
+
+    def test_an_open_transaction_is_rolled_back_before_reuse(self):
+        with self.fake_connect():
+            wrapper = self.wrapper(pooled_backend)
+            wrapper.ensure_connection()
+            connection = wrapper.connection
+            connection.info.transaction_status = 2
+            wrapper.close()
+            self.assertEqual(connection.info.transaction_status, 0)
+
+            wrapper.ensure_connection()
+            self.assertIs(wrapper.connection, connection)
+            connection.closed = 1
+            wrapper.close()
+        self.assertEqual(pool_stats()['pooled']['discarded'], 1)
+
+
+@skipUnless(connection.settings_dict['ENGINE'] == 'hngUser.db.pooled',
+            'run against PostgreSQL with DB_POOL_ENABLED=True')
+class PooledPostgresTests(TransactionTestCase):
+
+    def test_a_thousand_requests_reuse_pooled_connections(self):
+        connection.close()
+        before = pool_stats()['default']
+        for _ in range(1000):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.close()
+        after = pool_stats()['default']
+        self.assertEqual(after['checkouts'] - before['checkouts'], 1000)
+        self.assertLessEqual(after['connects'] - before['connects'], 1)
+
+
+class CompiledSerializerTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='zoë@example.com', firstName='Zoë', lastName='Doe',
+                                        password=make_password('password123'), phone='')
+        self.token = RefreshToken.for_user(self.user).access_token
+        for i in range(3):
+            Organisation.objects.create_organisation(owner=self.user, name=f'Org “{i}”',
+                                                     description='' if i else 'Ünïcode')
+        self.org = Organisation.objects.order_by('id').first()
+
+    def assertSameJSON(self, serializer_class, instance, many=False):
+        compiled = compile_serializer(serializer_class)
+        fast = compiled.serialize_many(instance) if many else compiled.serialize(instance)
+        slow = serializer_class(instance, many=many).data
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(slow))
+
+    def test_models_and_values_render_identically(self):
+        for serializer_class in (UserSerializer, OrganisationSerializer, OrganisationMemberSerializer):
+            self.assertIsNotNone(compile_serializer(serializer_class).extractors)
+        organisations = list(Organisation.objects.order_by('id'))
+        self.assertSameJSON(OrganisationSerializer, organisations, many=True)
+        self.assertSameJSON(OrganisationSerializer, organisations[0])
+        self.assertSameJSON(OrganisationSerializer, list(
+            Organisation.objects.values(*OrganisationSerializer.Meta.fields)), many=True)
+        self.assertSameJSON(UserSerializer, self.user)
+        self.assertSameJSON(UserSerializer, User.objects.values(*UserSerializer.Meta.fields).get())
+        self.assertSameJSON(OrganisationMemberSerializer, self.org.member_rows(), many=True)
+
+    def test_none_and_missing_values_follow_drf(self):
+        self.assertSameJSON(OrganisationSerializer, {'orgId': self.org.orgId, 'name': 'Org', 'description': None})
+        # DRF leaves out a missing optional field; the compiled path defers to it.
+        self.assertSameJSON(UserSerializer, {'userId': self.user.pk, 'firstName': 'Zoë', 'lastName': 'Doe',
+                                             'email': self.user.email})
+        self.assertEqual(compile_serializer(UserSerializer).serialize_many([]), [])
+
+    def test_serializers_needing_drf_are_not_compiled(self):
+        class GreetingSerializer(UserSerializer):
+            greeting = SerializerMethodField()
+
+            class Meta(UserSerializer.Meta):
+                fields = UserSerializer.Meta.fields + ['greeting']
+
+            def get_greeting(self, user):
+                return f'Hello {user.firstName}'
+
+        self.assertIsNone(compile_serializer(GreetingSerializer).extractors)
+        self.assertSameJSON(GreetingSerializer, self.user)
+
+    def drf_response(self, message, data):
+        return JSONRenderer().render({"status": "success", "message": message, "data": data})
+
+    def test_views_respond_with_the_same_bytes(self):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        response = self.client.get(reverse('users', args=[self.user.pk]), **headers)
+        self.assertEqual(response.content, self.drf_response(
+            "User Data Retrieved", UserSerializer(self.user).data))
+
+        response = self.client.get(reverse('org_details', args=[self.org.orgId]), **headers)
+        self.assertEqual(response.content, self.drf_response(
+            "Organisation Data Retrieved", OrganisationSerializer(self.org).data))
+
+        response = self.client.get(reverse('organisations'), **headers)
+        self.assertEqual(response.content, self.drf_response("Zoë's Organisations", {
+            "organisations": OrganisationSerializer(Organisation.objects.order_by('id'), many=True).data,
+            "next": None,
+            "previous": None,
+        }))
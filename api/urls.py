@@ -2,16 +2,27 @@ from django.urls import path
 from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView)
 
-from .views import OrganisationDetailView, OrganisationView, UserView
+from .views import (ExportView, OrganisationBatchView, OrganisationDetailView,
+                    OrganisationMembersView, OrganisationSearchView,
+                    OrganisationView, UserBatchView, UserDirectoryView,
+                    UserView)
 
 urlpatterns = [
     path('token/',  TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
     path('organisations', OrganisationView.as_view(), name='organisations'),
+    path('organisations/batch', OrganisationBatchView.as_view(), name='organisations_batch'),
+    path('organisations/search', OrganisationSearchView.as_view(), name='organisations_search'),
     path('organisations/<uuid:orgId>', OrganisationDetailView.as_view(), name='org_details'),
-    path('organisations/<uuid:orgId>/users', OrganisationDetailView.as_view(), name='add_user'),
+    path('organisations/<uuid:orgId>/users', OrganisationMembersView.as_view(), name='add_user'),
     
+    path('export/organisations', ExportView.as_view(), {'name': 'organisations'}, name='export_organisations'),
+    path('export/members', ExportView.as_view(), {'name': 'members'}, name='export_members'),
+
+    path('users', UserBatchView.as_view(), name='users_list'),
+    path('users/batch', UserBatchView.as_view(), name='users_batch'),
+    path('users/search', UserDirectoryView.as_view(), name='users_search'),
     path('users/<uuid:userId>', UserView.as_view(), name='users'),
 
     
@@ -1,63 +1,231 @@
-from django.contrib.auth import authenticate, login
+from uuid import UUID
+
+from django.conf import settings
+from django.contrib.auth import authenticate, login, user_logged_in
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.http import JsonResponse
 from django.views.decorators.csrf import requires_csrf_token
 from rest_framework import generics, status
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from .cache import bump_organisation_lists, get_organisation_list_cache
+from .conditional import content_etag, not_modified
+from .export import CONTENT_TYPES, export_response
+from .fast_serializers import compile_serializer
+from .hashing import HashingUnavailable
 from .models import Organisation, User
-from .permissions import isOwner
-from .serializers import (LoginSerializer, OrganisationSerializer,
-                          RegisterUserSerializer, UserSerializer)
+from .pagination import (OrganisationCursorPagination,
+                         OrganisationMemberPagination, UserDirectoryPagination)
+from .permissions import isOwner, isSuperuser
+from .serializers import (LoginSerializer, OrganisationMemberSerializer,
+                          OrganisationSerializer, RegisterUserSerializer,
+                          UserSerializer)
 
 # Create your views here.
 
 
+def hashing_unavailable_response():
+    return Response(data={
+        "status": "Service unavailable",
+        "message": "Server busy, try again shortly",
+        "statusCode": 503
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+def registration_failed_response(errors):
+    return Response(data={
+        "status": "Bad request",
+        "message": "Registration unsuccessful",
+        "errors": errors,
+        "statusCode": 400
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def batch_lookup(queryset, lookup_field, raw_ids, serializer_class):
+    """
+    Fetch every row whose `lookup_field` is in `raw_ids` with one query.
+    Returns the serialized rows keyed by the ids as given (None for ids that
+    don't match anything) and the list of ids that weren't found, or None if
+    `raw_ids` isn't an acceptable list of ids.
+    """
+    if not isinstance(raw_ids, list) or not 0 < len(raw_ids) <= settings.BATCH_MAX_IDS:
+        return None
+
+    parsed = {}
+    for raw in raw_ids:
+        try:
+            parsed[str(raw)] = UUID(str(raw).strip())
+        except ValueError:
+            parsed[str(raw)] = None
+
+    rows = {
+        getattr(row, lookup_field): row
+        for row in queryset.filter(**{f"{lookup_field}__in": {v for v in parsed.values() if v}})
+    }
+    results = {
+        raw: serializer_class(rows[value]).data if value in rows else None
+        for raw, value in parsed.items()
+    }
+    return results, [raw for raw, data in results.items() if data is None]
+
+
+def batch_response(key, lookup):
+    if lookup is None:
+        return Response(data={
+            "status": "Bad request",
+            "message": "Client error",
+            "statusCode": 400
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    results, not_found = lookup
+    return Response(data={
+        "status": "success",
+        "message": f"{key.capitalize()} Retrieved",
+        "data": {
+            key: results,
+            "notFound": not_found
+        }
+    }, status=status.HTTP_200_OK)
+
+
+def split_ids(value):
+    return [part for part in value.split(',') if part] if value else []
+
+
 class UserView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, userId):
-        # retrieves user detail
-        try:
-            user = User.objects.get(userId=userId)
-            if user:
-                serializer = UserSerializer(user)
-                return_data = {
-                    "status": "success",
-                    "message": "User Data Retrieved",
-                    "data": serializer.data
-                }
-
-                return Response(data=return_data, status=status.HTTP_200_OK)
-        except ObjectDoesNotExist:
+        # retrieves user detail; the row's values double as its ETag so an
+        # unchanged user is answered with a 304 before any serialization
+        values = User.objects.filter(userId=userId).values(*UserSerializer.Meta.fields).first()
+        if values is None:
             return Response(data={
                 "status": "Bad request",
                 "message": "Client error",
                 "statusCode": 400
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        etag = content_etag(values)
+        if not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        return_data = {
+            "status": "success",
+            "message": "User Data Retrieved",
+            "data": compile_serializer(UserSerializer).serialize(values)
+        }
+        return Response(data=return_data, status=status.HTTP_200_OK, headers={"ETag": etag})
+
+
+class UserBatchView(APIView):
+    """
+    GET /api/users?ids=<id>,<id> or POST /api/users/batch {"ids": [...]}.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def lookup(self, raw_ids):
+        return batch_response("users", batch_lookup(
+            User.objects.only(*UserSerializer.Meta.fields), 'userId', raw_ids, UserSerializer))
+
+    def get(self, request):
+        return self.lookup(split_ids(request.query_params.get('ids')))
+
+    def post(self, request):
+        return self.lookup(request.data.get('ids'))
+
+
+class UserDirectoryView(generics.ListAPIView):
+    """
+    GET /api/users/search?email=<email> for an exact (case-insensitive)
+    email match, or ?q=<prefix> for users whose first or last name starts
+    with it. Returns only the UserSerializer fields, a cursor page at a time.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = UserDirectoryPagination
+
+    def get_queryset(self):
+        email = self.request.query_params.get('email', '').strip()
+        prefix = self.request.query_params.get('q', '').strip()
+        if email:
+            users = User.objects.with_email(email)
+        elif prefix:
+            users = User.objects.with_name_prefix(prefix)
+        else:
+            raise NotFound
+        return users.values(*UserSerializer.Meta.fields)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            page = self.paginate_queryset(self.get_queryset())
+        except NotFound:
+            # No search term, or a bad cursor.
+            return Response(data={
+                "status": "Bad Request",
+                "message": "Client error",
+                "statusCode": 400
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(data={
+            "status": "success",
+            "message": "Users Retrieved",
+            "data": {
+                "users": UserSerializer(page, many=True).data,
+                "next": self.paginator.get_next_link(),
+                "previous": self.paginator.get_previous_link()
+            }
+        }, status=status.HTTP_200_OK)
+
+
+def organisation_list_page(request, user):
+    """
+    One page of `user`'s organisations for GET /api/organisations, served
+    from the per-user cache when it's on. `request` is a DRF Request; a bad
+    cursor raises NotFound. Shared with the async view.
+    """
+    use_cache = settings.ORG_LIST_CACHE['ENABLED']
+    if use_cache:
+        cache = get_organisation_list_cache()
+        variant = request.build_absolute_uri()
+        generation, page_data = cache.lookup(user.pk, variant)
+        if page_data is not None:
+            return page_data
+
+    paginator = OrganisationCursorPagination()
+    page = paginator.paginate_queryset(Organisation.objects.filter(memberships__user=user), request)
+    page_data = {
+        "organisations": compile_serializer(OrganisationSerializer).serialize_many(page),
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link()
+    }
+    if use_cache:
+        cache.store(user.pk, generation, variant, page_data)
+    return page_data
+
 
 class OrganisationView(generics.ListCreateAPIView):
     serializer_class = OrganisationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OrganisationCursorPagination
 
     def get_queryset(self):
         user = self.request.user
-        return Organisation.objects.filter(Q(owner=user) | Q(users=user)).distinct()
+        return Organisation.objects.filter(memberships__user=user)
 
     def get(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            return OrganisationBatchView.lookup(request, split_ids(request.query_params['ids']))
+
         try:
-            orgList = super().get(request, *args, **kwargs).data
             return_data = {
                 "status": "success",
                 "message": f"{request.user.firstName}'s Organisations",
-                "data": {
-                    "organisations": orgList
-                }
+                "data": organisation_list_page(request, request.user)
             }
             return Response(data=return_data, status=status.HTTP_200_OK)
         except Exception as e:
@@ -80,6 +248,83 @@ class OrganisationView(generics.ListCreateAPIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class OrganisationBatchView(APIView):
+    """
+    GET /api/organisations?ids=<id>,<id> or POST /api/organisations/batch
+    {"ids": [...]}. Only organisations the caller belongs to are returned.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @staticmethod
+    def lookup(request, raw_ids):
+        return batch_response("organisations", batch_lookup(
+            Organisation.objects.filter(memberships__user=request.user),
+            'orgId', raw_ids, OrganisationSerializer))
+
+    def post(self, request):
+        return self.lookup(request, request.data.get('ids'))
+
+
+class OrganisationSearchView(generics.ListAPIView):
+    """
+    GET /api/organisations/search?q=<prefix>: the caller's organisations
+    whose name starts with `q`, ignoring case, one cursor page at a time.
+    See migration 0004 for the indexes behind it.
+    """
+    serializer_class = OrganisationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = OrganisationCursorPagination
+
+    def get_queryset(self):
+        return Organisation.objects.filter(
+            memberships__user=self.request.user,
+            name__istartswith=self.query,
+        ).only(*OrganisationSerializer.Meta.fields)
+
+    def get(self, request, *args, **kwargs):
+        self.query = request.query_params.get('q', '').strip()
+        max_length = Organisation._meta.get_field('name').max_length
+        try:
+            if not 0 < len(self.query) <= max_length:
+                raise NotFound
+            page = self.paginate_queryset(self.get_queryset())
+        except NotFound:
+            # A missing query or a bad cursor.
+            return Response(data={
+                "status": "Bad Request",
+                "message": "Client error",
+                "statusCode": 400
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(data={
+            "status": "success",
+            "message": "Organisations Retrieved",
+            "data": {
+                "organisations": self.get_serializer(page, many=True).data,
+                "next": self.paginator.get_next_link(),
+                "previous": self.paginator.get_previous_link()
+            }
+        }, status=status.HTTP_200_OK)
+
+
+class ExportView(APIView):
+    """
+    GET /api/export/organisations or /api/export/members, streamed as
+    ?output=ndjson (default) or ?output=csv. Superusers only.
+    """
+    permission_classes = [IsAuthenticated, isSuperuser]
+
+    def get(self, request, name):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in CONTENT_TYPES:
+            return Response(data={
+                "status": "Bad Request",
+                "message": "Client error",
+                "statusCode": 400
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(name, output)
+
+
 class OrganisationDetailView(APIView):
 
     def get_permissions(self):
@@ -91,57 +336,125 @@ class OrganisationDetailView(APIView):
         return [permission() for permission in permission_classes]
 
     def get(self, request, orgId):
-        # retrieves user detail
-        try:
-            org = Organisation.objects.get(orgId=orgId)
-            if org:
-                serializer = OrganisationSerializer(org)
-                return_data = {
-                    "status": "success",
-                    "message": "Organisation Data Retrieved",
-                    "data": serializer.data
-                }
-
-                return Response(data=return_data, status=status.HTTP_200_OK)
-        except ObjectDoesNotExist:
+        # retrieves organisation detail, answering unchanged ones with a 304
+        values = Organisation.objects.filter(orgId=orgId).values(
+            *OrganisationSerializer.Meta.fields).first()
+        if values is None:
             return Response(data={
                 "status": "Bad request",
                 "message": "Client error",
                 "statusCode": 400
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        etag = content_etag(values)
+        if not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        return_data = {
+            "status": "success",
+            "message": "Organisation Data Retrieved",
+            "data": compile_serializer(OrganisationSerializer).serialize(values)
+        }
+        return Response(data=return_data, status=status.HTTP_200_OK, headers={"ETag": etag})
+
     def post(self, request, orgId):
+        user_ids = request.data.get('userIds', request.data.get('userId'))
+        if isinstance(user_ids, list):
+            return self.add_users(orgId, user_ids)
+
         try:
             org = Organisation.objects.get(orgId=orgId)
+            # Only the owner may add members; raises PermissionDenied (403).
+            self.check_object_permissions(request, org)
             user = User.objects.get(userId=request.data.get('userId'))
             if org:
                 org.users.add(user)
+                bump_organisation_lists(user.pk)
                 return_data = {
                     "status": "success",
                     "message": "User added to organisation successfully",
                 }
                 return Response(data=return_data, status=status.HTTP_200_OK)
+        except (ObjectDoesNotExist, DjangoValidationError):
+            # An unknown organisation or user, or a userId that isn't a UUID.
+            return Response(data={
+                "status": "Bad request",
+                "message": "Client error",
+                "statusCode": 400
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    def add_users(self, orgId, user_ids):
+        try:
+            org = Organisation.objects.get(orgId=orgId)
         except ObjectDoesNotExist:
+            org = None
+        if org is not None:
+            # As for a single userId, only the owner may add members.
+            self.check_object_permissions(self.request, org)
+        if org is None or not 0 < len(user_ids) <= settings.BULK_ADD_MAX_USERS:
+            return Response(data={
+                "status": "Bad request",
+                "message": "Client error",
+                "statusCode": 400
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(data={
+            "status": "success",
+            "message": "Users added to organisation successfully",
+            "data": {
+                "results": org.add_members(user_ids)
+            }
+        }, status=status.HTTP_200_OK)
+
+
+class OrganisationMembersView(OrganisationDetailView):
+    """
+    GET /api/organisations/<orgId>/users lists the members of an
+    organisation the caller belongs to, a cursor page at a time, in two
+    queries whatever the page size. POST adds members as before.
+    """
+    pagination_class = OrganisationMemberPagination
+
+    def get(self, request, orgId):
+        org = Organisation.objects.filter(orgId=orgId, memberships__user=request.user).only('pk').first()
+        paginator = self.pagination_class()
+        try:
+            if org is None:
+                raise NotFound
+            page = paginator.paginate_queryset(org.member_rows(), request, view=self)
+        except NotFound:
+            # Unknown organisation, not a member, or a bad cursor.
             return Response(data={
                 "status": "Bad request",
                 "message": "Client error",
                 "statusCode": 400
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        return Response(data={
+            "status": "success",
+            "message": "Organisation Members Retrieved",
+            "data": {
+                "users": OrganisationMemberSerializer(page, many=True).data,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link()
+            }
+        }, status=status.HTTP_200_OK)
+
 
 class RegisterUserView(APIView):
 
     def post(self, request):
         serializer = RegisterUserSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
+            try:
+                user = serializer.save()
+            except HashingUnavailable:
+                return hashing_unavailable_response()
+            except ValidationError as exc:
+                return registration_failed_response(exc.detail)
             # user = authenticate(email=user['email'], password=user['password'])
             refresh = RefreshToken.for_user(user)
 
-            org = Organisation.objects.create(
-                **{"owner": user, "name": f"{user.firstName}'s Organisaton"})
-            org.save()
-
             data = {
                 "status": "success",
                 "message": "Registration successful",
@@ -151,12 +464,7 @@ class RegisterUserView(APIView):
                 }
             }
             return Response(data=data, status=status.HTTP_201_CREATED)
-        return Response(data={
-            "status": "Bad request",
-            "message": "Registration unsuccessful",
-            "errors": serializer.errors,
-            "statusCode": 400
-        }, status=status.HTTP_400_BAD_REQUEST)
+        return registration_failed_response(serializer.errors)
 
 
 class LoginView(APIView):
@@ -166,9 +474,18 @@ class LoginView(APIView):
 
         if serializer.is_valid():
             user = serializer.data
-            user = authenticate(email=user['email'], password=user['password'])
+            try:
+                user = authenticate(email=user['email'], password=user['password'])
+            except HashingUnavailable:
+                return hashing_unavailable_response()
             if user:
-                login(request=request, user=user)
+                # Under TOKEN_ONLY_AUTH (and hngUser/settings_api.py) there is
+                # no session to log into; the token is all the client needs,
+                # but user_logged_in still goes out for its receivers.
+                if hasattr(request, 'session'):
+                    login(request=request, user=user)
+                else:
+                    user_logged_in.send(sender=user.__class__, request=request, user=user)
                 refresh = RefreshToken.for_user(user)
 
                 data = {
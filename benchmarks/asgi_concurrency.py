@@ -0,0 +1,142 @@
+"""
+Throughput and latency of the async views behind hngUser/asgi.py against the
+sync views behind hngUser/wsgi.py at 100-1000 concurrent connections.
+
+    pip install uvicorn gunicorn
+    python -m benchmarks.asgi_concurrency --concurrency 100 250 500 1000
+
+Both servers run a single worker process against the same SQLite file and
+are driven by an asyncio client opening one connection per request. Set
+DJANGO_SETTINGS_MODULE=hngUser.settings_api to measure the API-only stack.
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, setup_django, summarize, write_results
+
+SERVERS = {
+    'asgi': ('uvicorn', ['-m', 'uvicorn', 'hngUser.asgi:application',
+                         '--host', '127.0.0.1', '--port', '{port}', '--log-level', 'warning']),
+    'wsgi': ('gunicorn', ['-m', 'gunicorn', 'hngUser.wsgi:app',
+                          '--bind', '127.0.0.1:{port}', '--log-level', 'warning']),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port):
+    _, args = SERVERS[mode]
+    process = subprocess.Popen(
+        [sys.executable, *[arg.format(port=port) for arg in args]],
+        cwd=BASE_DIR, env=os.environ.copy(),
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'{mode} server did not start')
+
+
+async def fetch(port, request):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def load(port, path, token, concurrency, duration):
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+        f'Authorization: Bearer {token}\r\nConnection: close\r\n\r\n'
+    ).encode()
+    samples, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                code = await fetch(port, request)
+            except OSError:
+                code = None
+            if code == 200:
+                samples.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'requests_per_s': round(len(samples) / elapsed, 2),
+        'errors': errors,
+        **summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[100, 250, 500, 1000])
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--modes', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        module = SERVERS[mode][0]
+        if importlib.util.find_spec(module) is None:
+            parser.error(f'{module} is required for the {mode} run: pip install {module}')
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, min(hard, 65536)), hard))
+
+    setup_django()
+
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api.models import User
+
+    user = User.objects.create_user('bench@example.com', 'Bench', 'User', 'benchmark-password')
+    token = str(RefreshToken.for_user(user).access_token)
+    path = f'/api/users/{user.userId}'
+
+    results = {}
+    for mode in args.modes:
+        port = free_port()
+        process = start_server(mode, port)
+        try:
+            asyncio.run(load(port, path, token, 10, 1))
+            results[mode] = [
+                asyncio.run(load(port, path, token, concurrency, args.duration))
+                for concurrency in args.concurrency
+            ]
+        finally:
+            process.terminate()
+            process.wait()
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
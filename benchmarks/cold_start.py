@@ -0,0 +1,33 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import and set
+up Django, build the WSGI application and serve its first response, for the
+full settings and the API-only profile (hngUser/settings_api.py).
+
+    python -m benchmarks.cold_start --runs 20 --output coldstart.json
+
+The measuring itself is `manage.py coldstart`; this wrapper only fixes the
+environment and records the results.
+"""
+import argparse
+
+from benchmarks.common import setup_django, write_results
+
+PROFILES = ['hngUser.settings', 'hngUser.settings_api']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/api/organisations')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    setup_django()
+    from api.management.commands.coldstart import measure
+
+    results = {module: measure(module, args.runs, args.path) for module in PROFILES}
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Every script boots Django against a throwaway SQLite database so it can be
+run from a checkout without the Postgres instance used in deployment:
+
+    python -m benchmarks.<script> --help
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(db_path=None, **env):
+    """
+    Point the project at a SQLite file, configure Django and migrate it.
+    Extra keyword arguments are exported as environment variables first so
+    scripts can flip settings that are read from the environment.
+    """
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='hng-bench-'), 'bench.sqlite3')
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hngUser.settings')
+    os.environ['DEBUG'] = 'False'
+    os.environ['POSTGRES_URL'] = f'sqlite:///{db_path}'
+    os.environ.update({key: str(value) for key, value in env.items()})
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return db_path
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    return {
+        'count': len(samples),
+        'p50_ms': _ms(percentile(samples, 50)),
+        'p95_ms': _ms(percentile(samples, 95)),
+        'p99_ms': _ms(percentile(samples, 99)),
+        'max_ms': _ms(max(samples) if samples else None),
+    }
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 3)
+
+
+@contextmanager
+def serve(application=None):
+    """
+    Serve the WSGI app on an ephemeral port from a background thread and
+    yield its base URL.
+    """
+    from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                              WSGIRequestHandler)
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler, allow_reuse_address=True)
+    server.set_app(application or get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def write_results(results, output=None):
+    payload = json.dumps(results, indent=2, sort_keys=True)
+    if output:
+        Path(output).write_text(payload + '\n')
+    print(payload)
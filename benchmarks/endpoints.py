@@ -0,0 +1,150 @@
+"""
+End-to-end benchmark of the auth and organisation flow:
+
+    register -> login -> list orgs -> get org -> add user -> get user
+
+Each iteration registers a fresh user and walks the flow through Django's
+test client against a local SQLite database, so the numbers cover the
+middleware, views, serializers and ORM but not the network. Reports req/s,
+p50/p95/p99 latency and queries per request for every endpoint.
+
+    python -m benchmarks.endpoints --iterations 200 --output bench.json
+    python -m benchmarks.endpoints --baseline bench.json
+
+--hasher md5 swaps PBKDF2 for a cheap hasher so register/login numbers
+show everything except the deliberately slow password hash.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.common import (BASE_DIR, setup_django, summarize,
+                               write_results)
+
+FLOW = ['register', 'login', 'list_orgs', 'get_org', 'add_user', 'get_user']
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(iterations, warmup):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client(HTTP_HOST='localhost')
+    samples = defaultdict(list)
+    queries = defaultdict(list)
+
+    def call(name, method, path, data=None, token=None, record=True):
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        if data is not None:
+            extra.update(data=json.dumps(data), content_type='application/json')
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, **extra)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name} returned {response.status_code}: {response.content[:200]}')
+        if record:
+            samples[name].append(elapsed)
+            queries[name].append(len(ctx.captured_queries))
+        return response.json()
+
+    previous_user_id = None
+    for i in range(warmup + iterations):
+        record = i >= warmup
+        email, password = f'bench{i}@example.com', 'benchmark-password'
+
+        body = call('register', 'post', '/auth/register', {
+            'firstName': f'Bench{i}', 'lastName': 'User', 'email': email,
+            'password': password, 'phone': '08012345678',
+        }, record=record)
+        user_id = body['data']['user']['userId']
+
+        token = call('login', 'post', '/auth/login',
+                     {'email': email, 'password': password}, record=record)['data']['accessToken']
+
+        orgs = call('list_orgs', 'get', '/api/organisations', token=token, record=record)
+        org_id = orgs['data']['organisations'][0]['orgId']
+
+        call('get_org', 'get', f'/api/organisations/{org_id}', token=token, record=record)
+
+        if previous_user_id:
+            call('add_user', 'post', f'/api/organisations/{org_id}/users',
+                 {'userId': previous_user_id}, token=token, record=record)
+
+        call('get_user', 'get', f'/api/users/{user_id}', token=token, record=record)
+        previous_user_id = user_id
+
+    results = {}
+    for name in FLOW:
+        durations = samples[name]
+        results[name] = {
+            'requests_per_s': round(len(durations) / sum(durations), 2) if durations else None,
+            'queries_per_request': round(sum(queries[name]) / len(queries[name]), 2) if queries[name] else None,
+            **summarize(durations),
+        }
+    return results
+
+
+def compare(current, baseline):
+    print(f"{'endpoint':<12} {'p50 ms':>18} {'p99 ms':>18} {'queries':>14}")
+    for name in FLOW:
+        now, then = current['endpoints'].get(name), baseline['endpoints'].get(name)
+        if not now or not then:
+            continue
+        cells = [
+            f"{then[key]} -> {now[key]}"
+            for key in ('p50_ms', 'p99_ms', 'queries_per_request')
+        ]
+        print(f"{name:<12} {cells[0]:>18} {cells[1]:>18} {cells[2]:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--hasher', choices=['default', 'md5'], default='default')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    env = {'SQL_INSTRUMENTATION_SAMPLE_RATE': 0}
+    if args.hasher == 'md5':
+        env['PASSWORD_HASHING_WORKERS'] = 0
+    setup_django(**env)
+
+    import django
+    from django.conf import settings
+    if args.hasher == 'md5':
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'iterations': args.iterations,
+            'hasher': args.hasher,
+        },
+        'endpoints': run(args.iterations, args.warmup),
+    }
+    write_results(results, args.output)
+    if args.baseline:
+        compare(results, json.loads(Path(args.baseline).read_text()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Peak Python memory while streaming the exports under /api/export/, at two
+table sizes. With the rows read through QuerySet.iterator() the peak should
+stay roughly flat as the table grows.
+
+    python -m benchmarks.export_memory --sizes 10000 100000
+"""
+import argparse
+import time
+import tracemalloc
+import uuid
+
+from benchmarks.common import setup_django, write_results
+
+
+def seed(orgs):
+    from django.db import transaction
+
+    from api.models import Membership, Organisation, User
+
+    with transaction.atomic():
+        Membership.objects.all().delete()
+        Organisation.objects.all().delete()
+        owner, _ = User.objects.get_or_create(
+            email='export@example.com',
+            defaults={'firstName': 'Ex', 'lastName': 'Port', 'password': '!', 'is_superuser': True})
+        Organisation.objects.bulk_create(
+            (Organisation(name=f'Org {i}', owner=owner, orgId=uuid.uuid4()) for i in range(orgs)),
+            batch_size=5000,
+        )
+        Membership.objects.bulk_create(
+            (Membership(user=owner, organisation_id=pk, role=Membership.OWNER)
+             for pk in Organisation.objects.values_list('pk', flat=True).iterator()),
+            batch_size=5000,
+        )
+    return owner
+
+
+def stream(client, path, headers):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(path, **headers)
+    size = sum(len(chunk) for chunk in response.streaming_content)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'bytes': size,
+        'seconds': round(elapsed, 3),
+        'peak_mib': round(peak / 2 ** 20, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    setup_django(SQL_INSTRUMENTATION_SAMPLE_RATE=0)
+    from django.test import Client
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    client = Client(HTTP_HOST='localhost')
+    results = {}
+    for size in args.sizes:
+        owner = seed(size)
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(owner).access_token}'}
+        results[size] = {
+            f'{name}.{output}': stream(client, f'/api/export/{name}?output={output}', headers)
+            for name in ('organisations', 'members')
+            for output in ('ndjson', 'csv')
+        }
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+p99 latency of GET /api/organisations while /auth/login is being hammered,
+with password hashing on the request thread and through the hashing pool.
+
+    python -m benchmarks.hashing_pool --duration 10 --login-threads 8
+
+Each mode runs in its own interpreter so the pool settings are read fresh.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.common import serve, setup_django, summarize, write_results
+
+
+def _request(url, data=None, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    body = json.dumps(data).encode() if data is not None else None
+    request = urllib.request.Request(url, data=body, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+def run_mode(workers, duration, login_threads):
+    setup_django(PASSWORD_HASHING_WORKERS=workers)
+
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api.models import Organisation, User
+
+    password = 'benchmark-password'
+    users = [
+        User.objects.create_user(f'storm{i}@example.com', 'Storm', str(i), password)
+        for i in range(login_threads)
+    ]
+    reader = User.objects.create_user('reader@example.com', 'Reader', 'User', password)
+    Organisation.objects.create(name="Reader's Organisation", owner=reader)
+    token = str(RefreshToken.for_user(reader).access_token)
+
+    stop = threading.Event()
+    logins = []
+
+    def storm(user):
+        while not stop.is_set():
+            _request(f'{base_url}/auth/login', {'email': user.email, 'password': password})
+            logins.append(1)
+
+    with serve() as base_url:
+        # Warm the pool (and the URL resolver) before measuring.
+        _request(f'{base_url}/auth/login', {'email': reader.email, 'password': password})
+
+        threads = [threading.Thread(target=storm, args=(user,), daemon=True) for user in users]
+        for thread in threads:
+            thread.start()
+
+        samples = []
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            _request(f'{base_url}/api/organisations', token=token)
+            samples.append(time.perf_counter() - started)
+
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    return {
+        'workers': workers,
+        'logins_per_s': round(len(logins) / duration, 2),
+        'organisations': summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--pool-workers', type=int, default=2)
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--mode-workers', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode_workers is not None:
+        print(json.dumps(run_mode(args.mode_workers, args.duration, args.login_threads)))
+        return
+
+    results = {}
+    for label, workers in (('inline', 0), ('pool', args.pool_workers)):
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.hashing_pool',
+             '--duration', str(args.duration),
+             '--login-threads', str(args.login_threads),
+             '--mode-workers', str(workers)],
+            check=True, capture_output=True, text=True,
+        )
+        results[label] = json.loads(completed.stdout.strip().splitlines()[-1])
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Login throughput and database writes per login, with and without
+TOKEN_ONLY_AUTH. In the default mode every login goes through
+django.contrib.auth.login(), which saves a django_session row and rotates
+the CSRF token; in token-only mode /auth/login just issues the JWT.
+
+    python -m benchmarks.login_throughput --logins 500
+
+Writes are counted as INSERT/UPDATE/DELETE statements seen by the
+connection, and the django_session row count is reported after each run.
+A third run adds LAST_LOGIN_BUFFER, which folds the per-login last_login
+UPDATE into one batched write every MAX_LAG seconds.
+--hasher md5 (the default here) keeps PBKDF2 from drowning out the
+difference; pass --hasher default to see it with the real hasher.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import setup_django, summarize, write_results
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class WriteCounter:
+    def __init__(self):
+        self.writes = 0
+        self.session_writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith(WRITES):
+            self.writes += 1
+            if 'django_session' in sql:
+                self.session_writes += 1
+        return execute(sql, params, many, context)
+
+
+def seed(users, password):
+    from django.contrib.auth.hashers import make_password
+
+    from api.models import User
+
+    User.objects.all().delete()
+    hashed = make_password(password)
+    User.objects.bulk_create(
+        User(email=f'login{i}@example.com', firstName='Log', lastName=f'In{i}', password=hashed)
+        for i in range(users)
+    )
+
+
+def run(logins, users, password):
+    from django.conf import settings
+    from django.contrib.sessions.models import Session
+    from django.db import connection
+    from django.test import Client
+
+    from api.last_login import get_buffer
+
+    Session.objects.all().delete()
+    client = Client(HTTP_HOST='localhost')
+    counter = WriteCounter()
+    samples = []
+    with connection.execute_wrapper(counter):
+        for i in range(logins):
+            # API clients don't send the session cookie back.
+            client.cookies.clear()
+            body = json.dumps({'email': f'login{i % users}@example.com', 'password': password})
+            started = time.perf_counter()
+            response = client.post('/auth/login', data=body, content_type='application/json')
+            samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f'login returned {response.status_code}: {response.content[:200]}')
+        if settings.LAST_LOGIN_BUFFER['ENABLED']:
+            # Count the batched write the buffer still owes.
+            get_buffer().flush()
+
+    return {
+        'logins_per_s': round(len(samples) / sum(samples), 2),
+        'writes': counter.writes,
+        'writes_per_login': round(counter.writes / logins, 2),
+        'session_writes_per_login': round(counter.session_writes / logins, 2),
+        'session_rows': Session.objects.count(),
+        'set_cookies': sorted(response.cookies),
+        **summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=500)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--hasher', choices=['default', 'md5'], default='md5')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    env = {'SQL_INSTRUMENTATION_SAMPLE_RATE': 0}
+    if args.hasher == 'md5':
+        env['PASSWORD_HASHING_WORKERS'] = 0
+    setup_django(**env)
+
+    from django.conf import settings
+    from django.test.utils import override_settings
+    if args.hasher == 'md5':
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+    password = 'benchmark-password'
+    seed(args.users, password)
+    results = {}
+    runs = [
+        ('session', False, False),
+        ('token_only', True, False),
+        ('token_only_buffered_last_login', True, True),
+    ]
+    for label, token_only, buffered in runs:
+        # A fresh Client per run reloads the middleware chain, which reads
+        # TOKEN_ONLY_AUTH when it is built.
+        buffer = {**settings.LAST_LOGIN_BUFFER, 'ENABLED': buffered}
+        with override_settings(TOKEN_ONLY_AUTH=token_only, LAST_LOGIN_BUFFER=buffer):
+            results[label] = run(args.logins, args.users, password)
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+"My organisations" lookup: the old owner-OR-member query with DISTINCT
+against the single indexed Membership range scan.
+
+    python -m benchmarks.membership_query --memberships 1000000
+
+Seeding a million rows into SQLite takes a minute or two; pass --db to reuse
+a seeded file between runs.
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+
+from benchmarks.common import setup_django, summarize, write_results
+
+
+def seed(memberships, users, target_orgs):
+    from django.db import connection, transaction
+
+    from api.models import Membership, Organisation, User
+
+    if Membership.objects.exists():
+        return User.objects.get(email='target@example.com')
+
+    rng = random.Random(42)
+    per_org = 20
+    org_count = memberships // per_org
+
+    with transaction.atomic():
+        User.objects.bulk_create(
+            (User(email=f'user{i}@example.com', firstName='User', lastName=str(i), password='!')
+             for i in range(users)),
+            batch_size=5000,
+        )
+        target = User.objects.create(email='target@example.com', firstName='Target',
+                                     lastName='User', password='!')
+        user_ids = list(User.objects.values_list('pk', flat=True))
+
+        Organisation.objects.bulk_create(
+            (Organisation(name=f'Org {i}', owner_id=rng.choice(user_ids), orgId=uuid.uuid4())
+             for i in range(org_count)),
+            batch_size=5000,
+        )
+        orgs = list(Organisation.objects.values_list('pk', 'owner_id'))
+        target_picks = set(rng.sample(range(len(orgs)), min(target_orgs, len(orgs))))
+
+        pk_column = User._meta.pk
+        table = Membership._meta.db_table
+        rows = []
+        with connection.cursor() as cursor:
+            for index, (org_id, owner_id) in enumerate(orgs):
+                members = {owner_id}
+                if index in target_picks:
+                    members.add(target.pk)
+                while len(members) < per_org:
+                    members.add(rng.choice(user_ids))
+                for user_id in members:
+                    role = 'owner' if user_id == owner_id else 'member'
+                    rows.append((pk_column.get_db_prep_value(user_id, connection), org_id, role))
+                if len(rows) >= 50000:
+                    cursor.executemany(
+                        f'INSERT INTO {table} (user_id, organisation_id, role) VALUES (%s, %s, %s)', rows)
+                    rows = []
+            if rows:
+                cursor.executemany(
+                    f'INSERT INTO {table} (user_id, organisation_id, role) VALUES (%s, %s, %s)', rows)
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return target
+
+
+def measure(queryset, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.values_list('orgId', 'name', 'description'))
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--memberships', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=50_000)
+    parser.add_argument('--target-orgs', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--db', help='SQLite file to seed or reuse')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    setup_django(os.path.abspath(args.db) if args.db else None)
+
+    from django.db.models import Q
+
+    from api.models import Membership, Organisation
+
+    target = seed(args.memberships, args.users, args.target_orgs)
+
+    queries = {
+        'or_distinct': Organisation.objects.filter(
+            Q(owner=target) | Q(memberships__user=target)).distinct(),
+        'membership': Organisation.objects.filter(memberships__user=target),
+    }
+    results = {'memberships': Membership.objects.count()}
+    for label, queryset in queries.items():
+        results[label] = {
+            'rows': queryset.count(),
+            'plan': queryset.explain(),
+            **summarize(measure(queryset, args.repeat)),
+        }
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
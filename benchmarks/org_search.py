@@ -0,0 +1,128 @@
+"""
+Organisation search (GET /api/organisations/search?q=) against a large
+table, with and without the name index from migration 0004.
+
+    python -m benchmarks.org_search --orgs 1000000
+
+Two callers are measured: one who belongs to every organisation, where the
+name index has to do the work, and one who belongs to a few hundred, where
+the membership index already narrows things down. Seeding a million
+organisations into SQLite takes a minute or two; pass --db to reuse a
+seeded file between runs.
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+import uuid
+from importlib import import_module
+
+from benchmarks.common import setup_django, summarize, write_results
+
+SYLLABLES = ['ac', 'be', 'co', 'da', 'el', 'fo', 'gi', 'ha', 'in', 'jo', 'ka', 'lu',
+             'me', 'no', 'or', 'pa', 'qu', 'ri', 'so', 'tu', 'ul', 've', 'wi', 'xe']
+
+
+def seed(orgs, small_orgs):
+    from django.db import connection, transaction
+
+    from api.models import Membership, Organisation, User
+
+    if Organisation.objects.exists():
+        return User.objects.get(email='everything@example.com'), User.objects.get(email='few@example.com')
+
+    rng = random.Random(42)
+    words = [''.join(parts).capitalize() for parts in itertools.product(SYLLABLES, repeat=3)]
+
+    with transaction.atomic():
+        everything = User.objects.create(email='everything@example.com', firstName='Every',
+                                         lastName='Thing', password='!')
+        few = User.objects.create(email='few@example.com', firstName='Few', lastName='Orgs', password='!')
+        Organisation.objects.bulk_create(
+            (Organisation(name=f'{rng.choice(words)} {rng.choice(words)} {i}',
+                          owner=everything, orgId=uuid.uuid4())
+             for i in range(orgs)),
+            batch_size=5000,
+        )
+        org_ids = list(Organisation.objects.values_list('pk', flat=True))
+        few_picks = set(rng.sample(org_ids, min(small_orgs, len(org_ids))))
+
+        table = Membership._meta.db_table
+        user_pk = {user: User._meta.pk.get_db_prep_value(user.pk, connection) for user in (everything, few)}
+        with connection.cursor() as cursor:
+            for start in range(0, len(org_ids), 50000):
+                rows = [(user_pk[everything], org_id, 'owner') for org_id in org_ids[start:start + 50000]]
+                rows += [(user_pk[few], org_id, 'member') for org_id in org_ids[start:start + 50000]
+                         if org_id in few_picks]
+                cursor.executemany(
+                    f'INSERT INTO {table} (user_id, organisation_id, role) VALUES (%s, %s, %s)', rows)
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return everything, few
+
+
+def search(user, query):
+    # Mirrors OrganisationSearchView.get_queryset() and its first page.
+    from api.models import Organisation
+    from api.serializers import OrganisationSerializer
+
+    return Organisation.objects.filter(
+        memberships__user=user, name__istartswith=query,
+    ).only(*OrganisationSerializer.Meta.fields).order_by('id')[:101]
+
+
+def measure(queryset, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.all())
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def run(users, queries, repeat):
+    results = {}
+    for label, user in users.items():
+        for query in queries:
+            queryset = search(user, query)
+            results[f'{label}:{query}'] = {
+                'rows': len(queryset),
+                'plan': queryset.explain(),
+                **summarize(measure(queryset, repeat)),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orgs', type=int, default=1_000_000)
+    parser.add_argument('--few', type=int, default=300, help="organisations the small caller belongs to")
+    parser.add_argument('--query', action='append', help='search prefixes (default: acbe, ACBECO, xexexe)')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--db', help='SQLite file to seed or reuse')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    setup_django(os.path.abspath(args.db) if args.db else None)
+    from django.db import connection
+    search_migration = import_module('api.migrations.0004_organisation_name_search')
+
+    everything, few = seed(args.orgs, args.few)
+    users = {'all_orgs': everything, 'few_orgs': few}
+    queries = args.query or ['acbe', 'ACBECO', 'xexexe']
+
+    results = {'indexed': run(users, queries, args.repeat)}
+    with connection.schema_editor() as schema_editor:
+        search_migration.drop_search_index(None, schema_editor)
+    try:
+        results['unindexed'] = run(users, queries, args.repeat)
+    finally:
+        with connection.schema_editor() as schema_editor:
+            search_migration.create_search_index(None, schema_editor)
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
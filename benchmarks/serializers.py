@@ -0,0 +1,85 @@
+"""
+DRF ModelSerializers against the compiled serializers in
+api/fast_serializers.py, on lists of model instances (the organisation
+list) and of .values() dicts (the detail views), rendered to JSON the way
+the views do and on their own. Each pair is checked to produce the same
+bytes.
+
+    python -m benchmarks.serializers --items 10000
+"""
+import argparse
+import time
+import uuid
+
+from benchmarks.common import setup_django, summarize, write_results
+
+
+def make_rows(items):
+    from api.models import Organisation, User
+
+    users = [User(userId=uuid.uuid4(), email=f'user{i}@example.com', firstName=f'First{i}',
+                  lastName=f'Last{i}', phone='08012345678') for i in range(items)]
+    organisations = [Organisation(id=i, orgId=uuid.uuid4(), name=f'Organisation {i}',
+                                  description='' if i % 2 else f'Description {i}')
+                     for i in range(items)]
+    return {'user': users, 'organisation': organisations}
+
+
+def as_values(rows, fields):
+    return [{field: getattr(row, field) for field in fields} for row in rows]
+
+
+def measure(render, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    setup_django(SQL_INSTRUMENTATION_SAMPLE_RATE=0)
+    from rest_framework.renderers import JSONRenderer
+
+    from api.fast_serializers import compile_serializer
+    from api.serializers import OrganisationSerializer, UserSerializer
+
+    renderer = JSONRenderer()
+    serializers = {'user': UserSerializer, 'organisation': OrganisationSerializer}
+    results = {}
+    for name, rows in make_rows(args.items).items():
+        serializer_class = serializers[name]
+        compiled = compile_serializer(serializer_class)
+        inputs = {'models': rows, 'values': as_values(rows, serializer_class.Meta.fields)}
+        for kind, data in inputs.items():
+            def drf():
+                return renderer.render(serializer_class(data, many=True).data)
+
+            def fast():
+                return renderer.render(compiled.serialize_many(data))
+
+            if drf() != fast():
+                raise RuntimeError(f'{name} {kind}: compiled output differs from DRF')
+            timings = {
+                'drf': summarize(measure(drf, args.repeat)),
+                'compiled': summarize(measure(fast, args.repeat)),
+                # The same without the JSON rendering both share.
+                'drf_serialize_only': summarize(measure(
+                    lambda: serializer_class(data, many=True).data, args.repeat)),
+                'compiled_serialize_only': summarize(measure(
+                    lambda: compiled.serialize_many(data), args.repeat)),
+            }
+            timings['speedup_p50'] = round(timings['drf']['p50_ms'] / timings['compiled']['p50_ms'], 2)
+            results[f'{name}.{kind}'] = timings
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
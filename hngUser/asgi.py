@@ -2,6 +2,16 @@
 ASGI config for hngUser project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests served from here are routed through settings.ASGI_URLCONF
+(hngUser/asgi_urls.py, or hngUser/asgi_urls_api.py under settings_api) to
+the async views, e.g.:
+
+    uvicorn hngUser.asgi:application
+
+Every middleware in both profiles runs natively async. Django's session,
+CSRF, auth and message middleware still run their hooks on a thread,
+though. For the API, prefer hngUser.settings_api or TOKEN_ONLY_AUTH=True,
+which skip those hooks.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -9,8 +19,30 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+
+from hngUser.warmup import warm_up
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hngUser.settings')
 
-application = get_asgi_application()
+
+class AsyncURLConfHandler(ASGIHandler):
+    """
+    Resolve every request against ASGI_URLCONF rather than ROOT_URLCONF,
+    which the WSGI entry point and manage.py keep using.
+    """
+
+    async def get_response_async(self, request):
+        request.urlconf = settings.ASGI_URLCONF
+        return await super().get_response_async(request)
+
+
+django.setup(set_prefix=False)
+application = AsyncURLConfHandler()
+
+if settings.WARMUP_ON_BOOT:
+    # The connection step is skipped: it would open one on this thread,
+    # which no request runs on.
+    warm_up(settings.ASGI_URLCONF, connection=False)
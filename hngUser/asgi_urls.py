@@ -0,0 +1,22 @@
+"""
+URL configuration served by hngUser/asgi.py.
+
+Same routes as hngUser/urls.py, but the API and auth endpoints point at the
+async views in api/async_views.py.
+"""
+from api.async_views import AsyncLoginView, AsyncRegisterUserView
+from django.contrib import admin
+from django.urls import include, path
+
+from .views import index, ready
+
+urlpatterns = [
+    path('', index),
+    path('ready', ready, name='ready'),
+
+    path('admin/', admin.site.urls),
+    path('api/', include('api.async_urls')),
+
+    path('auth/login', AsyncLoginView.as_view(), name='login'),
+    path('auth/register', AsyncRegisterUserView.as_view(), name='register'),
+]
@@ -0,0 +1,17 @@
+"""
+URL configuration served by hngUser/asgi.py under hngUser/settings_api.py:
+the async API routes of hngUser/asgi_urls.py without the admin.
+"""
+from api.async_views import AsyncLoginView, AsyncRegisterUserView
+from django.urls import include, path
+
+from .views import index, ready
+
+urlpatterns = [
+    path('', index),
+    path('ready', ready, name='ready'),
+    path('api/', include('api.async_urls')),
+
+    path('auth/login', AsyncLoginView.as_view(), name='login'),
+    path('auth/register', AsyncRegisterUserView.as_view(), name='register'),
+]
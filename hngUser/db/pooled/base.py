@@ -0,0 +1,112 @@
+"""
+PostgreSQL backend that checks connections out of a per-process pool.
+
+Select it with ENGINE 'hngUser.db.pooled' (DB_POOL_ENABLED=True does that
+in settings) and size the pool through the database's "POOL" dict:
+
+    MIN_SIZE     connections kept open once made (default 0)
+    MAX_SIZE     most connections open at once (default 10)
+    MAX_IDLE     seconds an unused connection is kept (default 300)
+    TIMEOUT      seconds to wait for a free connection (default 10)
+    CHECK_AFTER  seconds idle after which a connection is tested with
+                 SELECT 1 before reuse (default 30)
+
+Django opens and closes its per-thread connection as usual (CONN_MAX_AGE=0
+closes it after every request); here "open" checks one out of the pool and
+"close" rolls it back to a clean state and returns it, so the TCP, TLS and
+auth handshake is paid once per pooled connection, not per request.
+"""
+import threading
+
+from django.db.backends.postgresql import base
+
+from .creation import DatabaseCreation
+from .pool import ConnectionPool, PoolTimeout
+
+# libpq's PQtransactionStatus values, the same in psycopg2 and psycopg 3.
+TRANSACTION_STATUS_IDLE = 0
+TRANSACTION_STATUS_UNKNOWN = 4
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_key(alias, conn_params):
+    # Test setup points an alias at another database, so the alias alone
+    # isn't enough to tell pools apart.
+    return alias, repr(sorted(conn_params.items()))
+
+
+def pool_stats():
+    """
+    Metrics for every pool in this process, keyed by database alias.
+    """
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {alias: pool.stats() for (alias, _), pool in pools}
+
+
+def close_pools(alias=None):
+    with _pools_lock:
+        keys = [key for key in _pools if alias is None or key[0] == alias]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+def select_one(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        key = pool_key(self.alias, conn_params)
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                config = self.settings_dict.get('POOL', {})
+                connect = super().get_new_connection
+                pool = _pools[key] = ConnectionPool(
+                    lambda: connect(conn_params),
+                    min_size=config.get('MIN_SIZE', 0),
+                    max_size=config.get('MAX_SIZE', 10),
+                    max_idle=config.get('MAX_IDLE', 300),
+                    timeout=config.get('TIMEOUT', 10),
+                    check=select_one,
+                    check_after=config.get('CHECK_AFTER', 30),
+                )
+            return pool
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        try:
+            return self.pool.getconn()
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            self.pool.putconn(self.connection, discard=not self.reset_connection())
+
+    def reset_connection(self):
+        """
+        Roll back whatever the last borrower left open. False if the
+        connection is broken and should be dropped instead of pooled.
+        """
+        connection = self.connection
+        if connection.closed:
+            return False
+        try:
+            status = connection.info.transaction_status
+            if status == TRANSACTION_STATUS_UNKNOWN:
+                return False
+            if status != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except self.Database.Error:
+            return False
+        return True
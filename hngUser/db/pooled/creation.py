@@ -0,0 +1,11 @@
+from django.db.backends.postgresql import creation
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would keep it from being
+        # dropped.
+        from .base import close_pools
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import Counter
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection frees up within the pool's timeout.
+    """
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of DB-API connections.
+
+    Connections are opened lazily, when a checkout finds none idle, and at
+    most `max_size` exist at once; further checkouts wait up to `timeout`
+    seconds. Idle connections are handed out most recently used first, so
+    the rest age out: anything idle for longer than `max_idle` seconds is
+    closed, down to `min_size` kept warm. A reused connection that sat idle
+    for `check_after` seconds or more is passed to `check` first and
+    replaced if that fails.
+
+    Reaping happens on checkout and return rather than on a timer thread,
+    which would not run on instances frozen between requests.
+    """
+
+    def __init__(self, connect, min_size=0, max_size=10, max_idle=300.0, timeout=10.0,
+                 check=None, check_after=30.0, clock=time.monotonic):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError('Pool sizes need 0 <= min_size <= max_size and max_size >= 1.')
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.check = check
+        self.check_after = check_after
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, returned_at), most recent last
+        self._size = 0
+        self._metrics = Counter()
+
+    def getconn(self):
+        deadline = self.clock() + self.timeout
+        with self._cond:
+            self._metrics['checkouts'] += 1
+        while True:
+            connection, returned_at = self._take(deadline)
+            if connection is None:
+                return self._open()
+            if self.check is None or self.clock() - returned_at < self.check_after or self._healthy(connection):
+                return connection
+            self._discard(connection)
+
+    def _take(self, deadline):
+        # An idle connection and when it was returned, or (None, None) once a
+        # slot for a new connection is reserved.
+        reaped = []
+        try:
+            with self._cond:
+                while True:
+                    reaped += self._reap()
+                    if self._idle:
+                        return self._idle.pop()
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None, None
+                    remaining = deadline - self.clock()
+                    self._metrics['waits'] += 1
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        self._metrics['timeouts'] += 1
+                        raise PoolTimeout(f'No database connection became free within {self.timeout}s')
+        finally:
+            _close_all(reaped)
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._metrics['connects'] += 1
+        return connection
+
+    def putconn(self, connection, discard=False):
+        if discard:
+            self._discard(connection)
+            return
+        with self._cond:
+            self._idle.append((connection, self.clock()))
+            reaped = self._reap()
+            self._cond.notify()
+        _close_all(reaped)
+
+    def close(self):
+        """
+        Close every idle connection; checked-out ones are closed when returned.
+        """
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        _close_all(connection for connection, _ in idle)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **{key: self._metrics[key] for key in
+                   ('checkouts', 'connects', 'reaped', 'discarded', 'waits', 'timeouts')},
+            }
+
+    def _healthy(self, connection):
+        try:
+            return self.check(connection) is not False
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        _close_quietly(connection)
+        with self._cond:
+            self._size -= 1
+            self._metrics['discarded'] += 1
+            self._cond.notify()
+
+    def _reap(self):
+        # Caller holds the lock and closes what comes back once it lets go.
+        # The oldest idle connections sit at the front.
+        cutoff = self.clock() - self.max_idle
+        reaped = []
+        while self._idle and self._size > self.min_size and self._idle[0][1] <= cutoff:
+            reaped.append(self._idle.pop(0)[0])
+            self._size -= 1
+        self._metrics['reaped'] += len(reaped)
+        return reaped
+
+
+def _close_all(connections):
+    for connection in connections:
+        _close_quietly(connection)
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
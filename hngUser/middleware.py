@@ -0,0 +1,441 @@
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from uuid import uuid4
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.middleware import clickjacking, common, security
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from api.authentication import CachedJWTAuthentication
+
+from .routers import STICKY_COOKIE, Routing, replica_aliases, routing
+
+sql_logger = logging.getLogger('hngUser.sql')
+
+
+def add_server_timing(response, *metrics):
+    values = [value for value in (response.get('Server-Timing'), *metrics) if value]
+    response['Server-Timing'] = ', '.join(values)
+
+
+class QueryStats:
+    """
+    Connection execute wrapper that tallies the statements it sees.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if elapsed >= self.slowest_duration:
+                self.slowest_duration = elapsed
+                self.slowest_sql = sql
+
+
+_query_stats = ContextVar('hngUser.query_stats', default=None)
+
+
+def tally_query(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_tally(connection, **kwargs):
+    if tally_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(tally_query)
+
+
+def install_query_tallies():
+    # Connections are per thread, so this covers the calling thread's. Those
+    # opened later on any thread get it from the connection_created receiver.
+    for connection in connections.all(initialized_only=True):
+        install_query_tally(connection)
+
+
+@contextmanager
+def counting_queries(stats):
+    """
+    Count into `stats` the queries run in this context. tally_query reads
+    the stats from a context variable, which sync_to_async carries into the
+    threads the ORM runs on under ASGI.
+    """
+    install_query_tallies()
+    token = _query_stats.set(stats)
+    try:
+        yield
+    finally:
+        _query_stats.reset(token)
+
+
+def counted_stream(content, stats, finished):
+    """
+    Iterate `content` with `stats` counting the queries each chunk runs,
+    then call `finished()` once the stream ends or is closed.
+    """
+    try:
+        iterator = iter(content)
+        while True:
+            with counting_queries(stats):
+                chunk = next(iterator, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        finished()
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Records the query count, total DB time and slowest statement of a
+    sampled fraction of requests. The numbers go out as a Server-Timing
+    header and as one JSON log line on the 'hngUser.sql' logger.
+
+    Queries run while a streaming response (the exports) is consumed are
+    counted too: the log line is written once the stream is done, while
+    Server-Timing, sent before the body, covers building the response only.
+    Async streaming content is not wrapped, so those queries go uncounted.
+
+    It runs natively under both WSGI and ASGI, so it never pushes the async
+    views onto a thread. SQL_INSTRUMENTATION_SAMPLE_RATE=0 drops the middleware entirely.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.SQL_INSTRUMENTATION_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        connection_created.connect(install_query_tally, dispatch_uid='hngUser.query_tally')
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        stats = QueryStats()
+        started = time.perf_counter()
+        with counting_queries(stats):
+            response = self.get_response(request)
+        return self.report(request, response, stats, started)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        # The ORM calls of the request share one worker thread, which may be
+        # one whose connection was opened before the receiver was connected.
+        await sync_to_async(install_query_tallies)()
+        stats = QueryStats()
+        started = time.perf_counter()
+        with counting_queries(stats):
+            response = await self.get_response(request)
+        return self.report(request, response, stats, started)
+
+    def report(self, request, response, stats, started):
+        total = time.perf_counter() - started
+        add_server_timing(
+            response,
+            f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"',
+            f'db-slowest;dur={stats.slowest_duration * 1000:.2f}',
+            f'app;dur={total * 1000:.2f}',
+        )
+        if response.streaming and not response.is_async:
+            response.streaming_content = counted_stream(
+                response.streaming_content, stats,
+                lambda: self.log(request, response, stats, time.perf_counter() - started))
+        else:
+            self.log(request, response, stats, total)
+        return response
+
+    def log(self, request, response, stats, total):
+        sql_logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": stats.count,
+            "dbMs": round(stats.duration * 1000, 3),
+            "totalMs": round(total * 1000, 3),
+            "slowestMs": round(stats.slowest_duration * 1000, 3),
+            "slowestSql": (stats.slowest_sql or "")[:500],
+        }))
+
+
+class InlineHooksMixin:
+    """
+    For MiddlewareMixin subclasses whose process_request and
+    process_response only look at headers and settings: under ASGI, call
+    them on the event loop. MiddlewareMixin.__acall__ hands each one to a
+    thread, which costs two thread hops per middleware per request.
+    """
+
+    async def __acall__(self, request):
+        response = None
+        if hasattr(self, 'process_request'):
+            response = self.process_request(request)
+        response = response or await self.get_response(request)
+        if hasattr(self, 'process_response'):
+            response = self.process_response(request, response)
+        return response
+
+
+class SecurityMiddleware(InlineHooksMixin, security.SecurityMiddleware):
+    pass
+
+
+class CommonMiddleware(InlineHooksMixin, common.CommonMiddleware):
+    pass
+
+
+class XFrameOptionsMiddleware(InlineHooksMixin, clickjacking.XFrameOptionsMiddleware):
+    pass
+
+
+PROFILE_SALT = 'hngUser.profiling'
+
+
+def make_profile_token():
+    """
+    Signed value for the X-Profile header; valid for PROFILING['MAX_AGE'].
+    """
+    return signing.TimestampSigner(salt=PROFILE_SALT).sign('profile')
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval and counts the
+    stacks in flamegraph "collapsed" form (root;...;leaf count).
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a single request on demand. A request is profiled when it
+    carries an X-Profile header holding a token from make_profile_token()
+    (see `manage.py profiletoken`), or X-Profile: 1 from a superuser.
+
+    The request runs under cProfile while a sampler records its stacks;
+    the .pstats and flamegraph-ready .collapsed files land in
+    PROFILING['OUTPUT_DIR'] and the response names them in X-Profile-Id.
+
+    Unless PROFILING['ENABLED'] is set the middleware removes itself from
+    the chain, and untriggered requests only pay for one header lookup.
+
+    Under ASGI the profile covers the event loop's thread, where the async
+    views run. ORM calls they hand to sync_to_async show up as time spent
+    awaiting them, and other requests in flight on the loop show up too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = settings.PROFILING
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        header = request.META.get('HTTP_X_PROFILE')
+        if not header or not self.should_profile(request, header):
+            return self.get_response(request)
+        with self.profiling() as profile_id:
+            response = self.get_response(request)
+        response['X-Profile-Id'] = profile_id
+        return response
+
+    async def __acall__(self, request):
+        header = request.META.get('HTTP_X_PROFILE')
+        if not header or not await sync_to_async(self.should_profile)(request, header):
+            return await self.get_response(request)
+        with self.profiling() as profile_id:
+            response = await self.get_response(request)
+        response['X-Profile-Id'] = profile_id
+        return response
+
+    def should_profile(self, request, header):
+        try:
+            signing.TimestampSigner(salt=PROFILE_SALT).unsign(header, max_age=self.config['MAX_AGE'])
+            return True
+        except signing.BadSignature:
+            pass
+
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            try:
+                result = CachedJWTAuthentication().authenticate(request)
+            except (InvalidToken, AuthenticationFailed):
+                result = None
+            user = result[0] if result else None
+        return bool(user and user.is_superuser)
+
+    @contextmanager
+    def profiling(self):
+        """
+        Profile the calling thread for the duration of the block, then write
+        the results under the id this yields.
+        """
+        import cProfile
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid4().hex[:8]}"
+        profiler = cProfile.Profile()
+        with StackSampler(threading.get_ident(), self.config['SAMPLE_INTERVAL']) as sampler:
+            profiler.enable()
+            try:
+                yield profile_id
+            finally:
+                profiler.disable()
+
+        output_dir = Path(self.config['OUTPUT_DIR'])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(output_dir / f'{profile_id}.pstats')
+        (output_dir / f'{profile_id}.collapsed').write_text(sampler.collapsed())
+
+
+def authenticated_user_id(request):
+    """
+    The pk of the request's authenticated user, or None if there isn't one
+    yet. A lazy request.user that nothing has evaluated counts as unknown:
+    evaluating it from inside the router would run a query of its own.
+    """
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        if user._wrapped is empty:
+            return None
+        user = user._wrapped
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Decides, per request, whether hngUser.routers may send reads to a
+    replica. Unsafe methods read from the primary throughout. After a
+    request that wrote, the same client reads from the primary too for
+    REPLICA_STICKY_SECONDS, so it always sees its own writes despite
+    replication lag. The client is recognised by a short-lived cookie and,
+    once the request is authenticated, by a per-user pin in the
+    REPLICA_STICKY_CACHE cache, which is what JWT clients rely on.
+
+    Without replicas in DATABASES the middleware removes itself.
+    """
+    sync_capable = True
+    async_capable = True
+    pin_prefix = 'hngUser.read_primary:'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = settings.REPLICA_STICKY_SECONDS
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.cache = caches[settings.REPLICA_STICKY_CACHE]
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.routing_state(request)
+        with routing(state):
+            response = self.get_response(request)
+        if state.wrote:
+            self.stick(response)
+            user_id = authenticated_user_id(request)
+            if user_id is not None:
+                self.cache.set(f'{self.pin_prefix}{user_id}', True, self.sticky_seconds)
+        return response
+
+    async def __acall__(self, request):
+        # sync_to_async copies the context, so the ORM's worker threads see
+        # this request's routing state.
+        state = self.routing_state(request)
+        with routing(state):
+            response = await self.get_response(request)
+        if state.wrote:
+            self.stick(response)
+            user_id = authenticated_user_id(request)
+            if user_id is not None:
+                await self.cache.aset(f'{self.pin_prefix}{user_id}', True, self.sticky_seconds)
+        return response
+
+    def routing_state(self, request):
+        return Routing(primary=request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES,
+                       sticky=lambda: self.pinned(request))
+
+    def stick(self, response):
+        response.set_cookie(STICKY_COOKIE, '1', max_age=self.sticky_seconds,
+                            httponly=True, samesite='Lax')
+
+    def pinned(self, request):
+        user_id = authenticated_user_id(request)
+        if user_id is None:
+            return None
+        return self.cache.get(f'{self.pin_prefix}{user_id}', False)
@@ -0,0 +1,107 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_PREFIX = 'replica'
+
+# Set on responses to requests that wrote; see ReplicaRoutingMiddleware.
+STICKY_COOKIE = 'read_primary'
+
+# Set by hngUser.middleware.ReplicaRoutingMiddleware for the duration of a
+# request, and by manage.py around a command; elsewhere every read may go
+# to a replica.
+_routing = ContextVar('hngUser.routing', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+class Routing:
+    """
+    Per-request routing state. `primary` pins reads to the primary; `wrote`
+    records that the request wrote, so the client's next reads can stick to
+    the primary until the replicas have caught up.
+
+    `sticky`, if given, is asked on each read whether an earlier write pinned
+    this client. It returns None while it can't tell yet (the request isn't
+    authenticated yet) and is dropped once it has answered.
+    """
+    __slots__ = ('primary', 'wrote', 'sticky')
+
+    def __init__(self, primary=False, sticky=None):
+        self.primary = primary
+        self.wrote = False
+        self.sticky = sticky
+
+    def read_primary(self):
+        if self.sticky is not None and not self.primary:
+            # Cleared while it runs, in case answering reads the database.
+            sticky, self.sticky = self.sticky, None
+            pinned = sticky()
+            if pinned is None:
+                self.sticky = sticky
+            else:
+                self.primary = pinned
+        return self.primary
+
+
+@contextmanager
+def routing(state):
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary inside this block, e.g. to read back a write made
+    outside the current request.
+    """
+    with routing(Routing(primary=True)) as state:
+        yield state
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the primary ('default'); reads go to a random replica
+    (DATABASES['replica<n>'], see REPLICA_URLS) unless the current request
+    is pinned to the primary, or a transaction is open on the primary and
+    the read has to see its writes. With no replicas configured everything
+    stays on 'default'.
+    """
+
+    def __init__(self, replicas=None):
+        self.replicas = replica_aliases() if replicas is None else replicas
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        state = _routing.get()
+        if state and state.read_primary():
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            # Later reads in this request must see the write too. Without a
+            # state there is nothing scoping the pin, so none is set.
+            state.primary = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        return db == DEFAULT_DB_ALIAS
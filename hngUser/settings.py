@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 import dj_database_url
@@ -56,17 +57,61 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    "whitenoise.middleware.WhiteNoiseMiddleware",
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'hngUser.middleware.QueryInstrumentationMiddleware',
+    'hngUser.middleware.ReplicaRoutingMiddleware',
+    'hngUser.middleware.SecurityMiddleware',
+    'hngUser.static.WhiteNoiseMiddleware',
+    'hngUser.token_only.TokenOnlySessionMiddleware',
+    'hngUser.middleware.CommonMiddleware',
+    'hngUser.token_only.TokenOnlyCsrfViewMiddleware',
+    'hngUser.token_only.TokenOnlyAuthenticationMiddleware',
+    'hngUser.token_only.TokenOnlyMessageMiddleware',
+    'hngUser.middleware.XFrameOptionsMiddleware',
+    'hngUser.middleware.ProfilingMiddleware',
 ]
 
+# With TOKEN_ONLY_AUTH=True the session, CSRF, auth and message middleware
+# step aside for paths under TOKEN_ONLY_PATHS, which authenticate with JWTs,
+# and a login there issues a token without creating a session.
+TOKEN_ONLY_AUTH = os.environ.get("TOKEN_ONLY_AUTH") == "True"
+TOKEN_ONLY_PATHS = ['/auth/', '/api/']
+
+# Fraction of requests whose SQL is measured and reported through a
+# Server-Timing header and the 'hngUser.sql' logger. 0 turns it off.
+SQL_INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get("SQL_INSTRUMENTATION_SAMPLE_RATE", 0.01))
+
+# On-demand profiling of single requests (hngUser/middleware.py). Off unless
+# PROFILING_ENABLED=True; see `manage.py profiletoken` for triggering it.
+PROFILING = {
+    "ENABLED": os.environ.get("PROFILING_ENABLED") == "True",
+    "OUTPUT_DIR": os.environ.get("PROFILING_OUTPUT_DIR", os.path.join(tempfile.gettempdir(), "hnguser-profiles")),
+    "MAX_AGE": int(os.environ.get("PROFILING_TOKEN_MAX_AGE", 300)),
+    "SAMPLE_INTERVAL": float(os.environ.get("PROFILING_SAMPLE_INTERVAL", 0.001)),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        "hngUser": {
+            "handlers": ["console"],
+            "level": os.environ.get("HNGUSER_LOG_LEVEL", "INFO"),
+        },
+    },
+}
+
+# Run hngUser/warmup.py from wsgi.py/asgi.py so the first request on a fresh
+# instance doesn't pay for the DB connection, URL resolver and serializers.
+WARMUP_ON_BOOT = os.environ.get("WARMUP_ON_BOOT") == "True"
+
 ROOT_URLCONF = 'hngUser.urls'
+# Served by hngUser/asgi.py instead of ROOT_URLCONF: the async views.
+ASGI_URLCONF = 'hngUser.asgi_urls'
 AUTH_USER_MODEL = 'api.User'
 
 TEMPLATES = [
@@ -119,6 +164,42 @@ DATABASES = {
     )
 }
 
+# Read replicas of the primary above, as comma-separated database URLs.
+# Each one becomes DATABASES["replica<n>"]; hngUser/routers.py sends reads
+# there and writes to "default". Tests run them as mirrors of "default".
+REPLICA_URLS = [url for url in os.environ.get("REPLICA_URLS", "").split(",") if url]
+for index, url in enumerate(REPLICA_URLS):
+    DATABASES[f'replica{index}'] = {
+        **dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# DB_POOL_ENABLED=True serves PostgreSQL connections from a per-process
+# pool (hngUser/db/pooled) instead of one persistent connection per worker
+# thread. Connections go back to the pool at the end of every request, so a
+# few of them cover all threads and a warm instance skips the handshake.
+DB_POOL = {
+    "MIN_SIZE": int(os.environ.get("DB_POOL_MIN_SIZE", 0)),
+    "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 4)),
+    "MAX_IDLE": float(os.environ.get("DB_POOL_MAX_IDLE", 300)),
+    "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+    "CHECK_AFTER": float(os.environ.get("DB_POOL_CHECK_AFTER", 30)),
+}
+if os.environ.get("DB_POOL_ENABLED") == "True":
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.postgresql':
+            database.update(ENGINE='hngUser.db.pooled', CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False, POOL=DB_POOL)
+
+DATABASE_ROUTERS = ['hngUser.routers.PrimaryReplicaRouter']
+
+# After a request that wrote, the same client reads from the primary for
+# this many seconds (hngUser.middleware.ReplicaRoutingMiddleware): through a
+# cookie, and for authenticated users through a per-user pin kept in the
+# REPLICA_STICKY_CACHE alias of CACHES, which covers JWT clients. With more
+# than one instance, point that alias at a shared cache.
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+REPLICA_STICKY_CACHE = os.environ.get("REPLICA_STICKY_CACHE", "default")
+
 
 
 
@@ -141,12 +222,67 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+AUTHENTICATION_BACKENDS = [
+    'api.backends.PooledModelBackend',
+]
+
+# Password hashing runs in a bounded process pool (api/hashing.py).
+# Set PASSWORD_HASHING_WORKERS=0 to hash on the request thread instead.
+PASSWORD_HASHING_POOL = {
+    "WORKERS": int(os.environ.get("PASSWORD_HASHING_WORKERS", 2)),
+    "MAX_PENDING": int(os.environ.get("PASSWORD_HASHING_MAX_PENDING", 64)),
+    "TIMEOUT": float(os.environ.get("PASSWORD_HASHING_TIMEOUT", 5)),
+}
+
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     )
 }
 
+# Users behind a JWT are resolved from an in-process LRU cache
+# (api/authentication.py). Set JWT_USER_CACHE_ENABLED=False to bypass it.
+JWT_USER_CACHE = {
+    "ENABLED": os.environ.get("JWT_USER_CACHE_ENABLED") != "False",
+    "MAX_SIZE": int(os.environ.get("JWT_USER_CACHE_MAX_SIZE", 1024)),
+    "TTL": float(os.environ.get("JWT_USER_CACHE_TTL", 300)),
+}
+
+# last_login is written behind (api/last_login.py): logins queue a timestamp
+# and the queue is written in one UPDATE by the login or request that finds
+# the oldest entry MAX_LAG seconds old or MAX_PENDING users waiting, and
+# again at exit. Nothing flushes between requests, so an idle instance holds
+# its queue until the next request, and one frozen and then killed without
+# a clean exit loses whatever is still queued.
+LAST_LOGIN_BUFFER = {
+    "ENABLED": os.environ.get("LAST_LOGIN_BUFFER_ENABLED") == "True",
+    "MAX_LAG": float(os.environ.get("LAST_LOGIN_BUFFER_MAX_LAG", 10)),
+    "MAX_PENDING": int(os.environ.get("LAST_LOGIN_BUFFER_MAX_PENDING", 1000)),
+}
+
+# Per-user "my organisations" pages are cached behind a generation stamp
+# (api/cache.py). BACKEND is "lru" for an in-process cache or a CACHES alias.
+# Off by default: invalidation only reaches the process that made the write,
+# so with several instances an in-process cache (or locmem) keeps serving
+# stale pages until TTL. Enable it with BACKEND naming a shared cache.
+ORG_LIST_CACHE = {
+    "ENABLED": os.environ.get("ORG_LIST_CACHE_ENABLED") == "True",
+    "BACKEND": os.environ.get("ORG_LIST_CACHE_BACKEND", "lru"),
+    "MAX_SIZE": int(os.environ.get("ORG_LIST_CACHE_MAX_SIZE", 4096)),
+    "TTL": float(os.environ.get("ORG_LIST_CACHE_TTL", 300)),
+}
+
+# Largest userIds list accepted by POST /api/organisations/<orgId>/users.
+BULK_ADD_MAX_USERS = int(os.environ.get("BULK_ADD_MAX_USERS", 10000))
+
+# Most ids accepted by the batch lookups (GET /api/users?ids=..., etc.).
+BATCH_MAX_IDS = int(os.environ.get("BATCH_MAX_IDS", 1000))
+
+# Rows fetched per round trip (and written per chunk) by the streaming
+# exports under /api/export/.
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 2000))
+
 SIMPLE_JWT = {
     "USER_ID_FIELD": "email",
 }
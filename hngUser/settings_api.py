@@ -0,0 +1,42 @@
+"""
+API-only settings for the serverless deployment.
+
+Everything in hngUser/settings.py, minus what a JSON API never uses: the
+admin, sessions, messages, static files and whitenoise are not installed,
+so a cold start doesn't import them, and DRF only loads its JSON renderer
+and parser. Select it with DJANGO_SETTINGS_MODULE=hngUser.settings_api;
+`manage.py coldstart hngUser.settings hngUser.settings_api` compares the two.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'api',
+    'rest_framework',
+    'rest_framework_simplejwt',
+]
+
+MIDDLEWARE = [
+    'hngUser.middleware.QueryInstrumentationMiddleware',
+    'hngUser.middleware.ReplicaRoutingMiddleware',
+    'hngUser.middleware.SecurityMiddleware',
+    'hngUser.middleware.CommonMiddleware',
+    'hngUser.middleware.ProfilingMiddleware',
+]
+
+ROOT_URLCONF = 'hngUser.urls_api'
+ASGI_URLCONF = 'hngUser.asgi_urls_api'
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': (
+        'rest_framework.renderers.JSONRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'rest_framework.parsers.JSONParser',
+    ),
+}
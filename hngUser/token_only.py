@@ -0,0 +1,52 @@
+"""
+Session, CSRF, auth and message middleware that step aside on token-only
+paths. Only hngUser.settings uses these; they live apart from
+hngUser.middleware so the API-only profile never imports the session and
+message machinery they wrap.
+"""
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+
+
+class TokenOnlyExemptMixin:
+    """
+    Skips the wrapped middleware for paths under TOKEN_ONLY_PATHS when
+    TOKEN_ONLY_AUTH is on. Those paths authenticate with a JWT, so loading
+    a session, checking CSRF or attaching messages there is wasted work,
+    and a login would otherwise write a django_session row and set cookies.
+    Everything else (the admin, the index page) keeps the full behaviour.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.exempt_paths = tuple(settings.TOKEN_ONLY_PATHS) if settings.TOKEN_ONLY_AUTH else ()
+
+    def is_exempt(self, request):
+        return bool(self.exempt_paths) and request.path_info.startswith(self.exempt_paths)
+
+    def __call__(self, request):
+        if self.is_exempt(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class TokenOnlySessionMiddleware(TokenOnlyExemptMixin, SessionMiddleware):
+    pass
+
+
+class TokenOnlyCsrfViewMiddleware(TokenOnlyExemptMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if self.is_exempt(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class TokenOnlyAuthenticationMiddleware(TokenOnlyExemptMixin, AuthenticationMiddleware):
+    pass
+
+
+class TokenOnlyMessageMiddleware(TokenOnlyExemptMixin, MessageMiddleware):
+    pass
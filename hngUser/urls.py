@@ -20,7 +20,7 @@ from django.urls import include, path
 from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView)
 
-from .views import index
+from .views import index, ready
 
 # handler404 = custom_404
 # handler405 = custom_405
@@ -28,6 +28,7 @@ from .views import index
 
 urlpatterns = [
     path('', index),
+    path('ready', ready, name='ready'),
     
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
@@ -0,0 +1,17 @@
+"""
+URL configuration for hngUser/settings_api.py: the API routes without the
+admin.
+"""
+from api.views import LoginView, RegisterUserView
+from django.urls import include, path
+
+from .views import index, ready
+
+urlpatterns = [
+    path('', index),
+    path('ready', ready, name='ready'),
+    path('api/', include('api.urls')),
+
+    path('auth/login', LoginView.as_view(), name='login'),
+    path('auth/register', RegisterUserView.as_view(), name='register'),
+]
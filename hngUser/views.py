@@ -1,7 +1,8 @@
 # example/views.py
 from datetime import datetime
 
-from django.http import HttpResponse
+from django.db import DatabaseError, connection
+from django.http import HttpResponse, JsonResponse
 
 
 def index(request):
@@ -15,3 +16,21 @@ def index(request):
     </html>
     '''
     return HttpResponse(html)
+
+
+def ready(request):
+    # Readiness probe: one round trip to the database, nothing else.
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError:
+        return JsonResponse({
+            "status": "Service unavailable",
+            "message": "Database unavailable",
+            "statusCode": 503
+        }, status=503)
+    return JsonResponse({
+        "status": "success",
+        "message": "Ready",
+    })
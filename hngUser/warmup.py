@@ -0,0 +1,87 @@
+"""
+Boot-time warm-up, run from hngUser/wsgi.py and hngUser/asgi.py when
+WARMUP_ON_BOOT is set. It does the one-off work the first request would
+otherwise pay for: opening the database connection, populating the URL
+resolver and building the serializers' fields.
+"""
+import logging
+import time
+from uuid import UUID
+
+from django.db import DatabaseError, connections
+from django.urls import (
+    URLPattern, URLResolver, get_resolver, get_urlconf, resolve, reverse, set_urlconf,
+)
+from django.urls.converters import UUIDConverter
+
+logger = logging.getLogger('hngUser.warmup')
+
+
+def open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def named_patterns(patterns):
+    # Namespaced includes (the admin) aren't part of the API and are skipped.
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver) and not pattern.namespace:
+            yield from named_patterns(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern
+
+
+def resolve_routes():
+    """
+    Reverse and resolve every named API route with placeholder arguments,
+    which populates the resolver's caches and imports every view module.
+    """
+    for pattern in named_patterns(get_resolver(get_urlconf()).url_patterns):
+        kwargs = {
+            key: UUID(int=0) if isinstance(converter, UUIDConverter) else '0'
+            for key, converter in pattern.pattern.converters.items()
+        }
+        resolve(reverse(pattern.name, kwargs=kwargs))
+
+
+def build_serializers():
+    from api import serializers
+    for serializer_class in (serializers.UserSerializer, serializers.OrganisationSerializer,
+                             serializers.RegisterUserSerializer, serializers.LoginSerializer):
+        serializer_class().fields
+
+
+STEPS = [
+    ('connection', open_connections),
+    ('routes', resolve_routes),
+    ('serializers', build_serializers),
+]
+
+
+def warm_up(urlconf=None, connection=True):
+    """
+    Run every step and return how long each took in milliseconds. A database
+    that isn't reachable yet is logged and skipped rather than failing boot.
+    The routes warmed are `urlconf`'s, ROOT_URLCONF's by default.
+
+    Connections are per thread, so pass connection=False where requests
+    won't run on this thread: under ASGI each request gets a connection on
+    its own executor thread, and one opened here would sit unused.
+    """
+    timings = {}
+    set_urlconf(urlconf)
+    try:
+        for name, step in STEPS:
+            if name == 'connection' and not connection:
+                continue
+            started = time.perf_counter()
+            try:
+                step()
+            except DatabaseError as exc:
+                logger.warning('warm-up step %s failed: %s', name, exc)
+                continue
+            timings[name] = round((time.perf_counter() - started) * 1000, 2)
+    finally:
+        set_urlconf(None)
+    logger.info('warm-up finished: %s', timings)
+    return timings
@@ -2,6 +2,8 @@
 WSGI config for hngUser project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+Set DJANGO_SETTINGS_MODULE=hngUser.settings_api in the deployment to serve
+the API-only profile, which cold-starts faster (`manage.py coldstart`).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
@@ -9,9 +11,16 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from hngUser.warmup import warm_up
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hngUser.settings')
 
 application = get_wsgi_application()
+
+if settings.WARMUP_ON_BOOT:
+    warm_up()
+
 app = application
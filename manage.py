@@ -15,7 +15,11 @@ def main():
             "available on your PYTHONPATH environment variable? Did you "
             "forget to activate a virtual environment?"
         ) from exc
-    execute_from_command_line(sys.argv)
+    from hngUser.routers import use_primary
+
+    # Commands and the shell read their own writes; see hngUser/routers.py.
+    with use_primary():
+        execute_from_command_line(sys.argv)
 
 
 if __name__ == '__main__':